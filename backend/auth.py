@@ -3,18 +3,70 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import hashlib
+import logging
 import os
+import secrets
+import time
 from models import User
 from database import Database
+from deps import get_database
+from cache import TTLCache
+from metrics import RateMeter
 from eth_account.messages import encode_defunct
 from eth_account import Account
 import re
 
+logger = logging.getLogger(__name__)
+
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'moangem-secret-key-2024')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Rotating signing keys: JWT_KEYS="kid1:secret1,kid2:secret2" signs with JWT_ACTIVE_KID
+# (default: first listed) and accepts every listed kid. Without JWT_KEYS, tokens
+# carry no kid and use JWT_SECRET. Once JWT_KEYS is set, kid-less tokens are only
+# accepted while JWT_ACCEPT_KIDLESS_TOKENS=true (e.g. for one token lifetime after
+# switching), so the legacy secret can be retired
+def _parse_jwt_keys(spec: str) -> dict:
+    keys = {}
+    for entry in spec.split(','):
+        kid, sep, secret = entry.strip().partition(':')
+        if sep and kid and secret:
+            keys[kid] = secret
+    return keys
+
+JWT_KEYS = _parse_jwt_keys(os.environ.get('JWT_KEYS', ''))
+JWT_ACTIVE_KID = os.environ.get('JWT_ACTIVE_KID') or next(iter(JWT_KEYS), None)
+JWT_ACCEPT_KIDLESS_TOKENS = os.environ.get('JWT_ACCEPT_KIDLESS_TOKENS', 'false').lower() == 'true'
+
+# Decoded token cache configuration
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get('TOKEN_CACHE_TTL_SECONDS', '300'))
+
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+
+# Signature recovery runs off the event loop (SIGNATURE_POOL=thread | process)
+SIGNATURE_POOL = os.environ.get('SIGNATURE_POOL', 'thread').lower()
+SIGNATURE_POOL_SIZE = int(os.environ.get('SIGNATURE_POOL_SIZE', '4'))
+SIGNATURE_CACHE_SIZE = int(os.environ.get('SIGNATURE_CACHE_SIZE', '4096'))
+SIGNATURE_CACHE_TTL_SECONDS = float(os.environ.get('SIGNATURE_CACHE_TTL_SECONDS', '600'))
+
+signature_cache = TTLCache(maxsize=SIGNATURE_CACHE_SIZE, ttl=SIGNATURE_CACHE_TTL_SECONDS)
+signature_recoveries = RateMeter()
+_signature_executor: Optional[Executor] = None
+
+# Server-issued login nonces (LOGIN_NONCE_STORE=mongo | memory; memory only works with a single worker)
+LOGIN_NONCE_STORE = os.environ.get('LOGIN_NONCE_STORE', 'mongo').lower()
+LOGIN_NONCE_TTL_SECONDS = int(os.environ.get('LOGIN_NONCE_TTL_SECONDS', '300'))
+LOGIN_NONCE_MAX_PENDING = int(os.environ.get('LOGIN_NONCE_MAX_PENDING', '100000'))
+REQUIRE_LOGIN_NONCE = os.environ.get('REQUIRE_LOGIN_NONCE', 'false').lower() == 'true'
+LOGIN_MESSAGE_TEMPLATE = "Sign this message to authenticate with MoanGem:\n\nAddress: {address}\nNonce: {nonce}"
+
 security = HTTPBearer()
 
 def create_access_token(user_id: str, wallet_address: str) -> str:
@@ -26,12 +78,24 @@ def create_access_token(user_id: str, wallet_address: str) -> str:
         'exp': expire,
         'iat': datetime.utcnow()
     }
+    if JWT_ACTIVE_KID in JWT_KEYS:
+        return jwt.encode(payload, JWT_KEYS[JWT_ACTIVE_KID], algorithm=JWT_ALGORITHM, headers={'kid': JWT_ACTIVE_KID})
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def _verification_key(token: str) -> str:
+    kid = jwt.get_unverified_header(token).get('kid')
+    if kid is None:
+        if JWT_KEYS and not JWT_ACCEPT_KIDLESS_TOKENS:
+            raise jwt.InvalidTokenError("Token has no key id")
+        return JWT_SECRET
+    if kid not in JWT_KEYS:
+        raise jwt.InvalidTokenError(f"Unknown key id: {kid}")
+    return JWT_KEYS[kid]
+
 def verify_token(token: str) -> dict:
     """Verify and decode JWT token"""
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, _verification_key(token), algorithms=[JWT_ALGORITHM])
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -44,21 +108,25 @@ def verify_token(token: str) -> dict:
             detail="Invalid token"
         )
 
+def verify_token_cached(token: str) -> dict:
+    """Verify a token, serving repeats from the decoded-claims cache until exp"""
+    # Key by digest so the cache never holds usable bearer tokens
+    key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = verify_token(token)
+        # Never keep a decoded token past its own expiry
+        token_cache.set(key, payload, ttl=payload['exp'] - time.time())
+    return payload
+
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Database = Depends(get_database)
 ) -> User:
     """Get current authenticated user from JWT token"""
-    from motor.motor_asyncio import AsyncIOMotorClient
-    import os
-    
-    payload = verify_token(credentials.credentials)
-    
-    # Create database connection
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    db = Database(client)
+    payload = verify_token_cached(credentials.credentials)
     
-    user = await db.get_user_by_id(payload['user_id'])
+    user = await db.get_cached_user(payload['user_id'])
     
     if not user:
         raise HTTPException(
@@ -66,39 +134,162 @@ async def get_current_user(
             detail="User not found"
         )
     
-    client.close()
     return user
 
+def recover_signer(message: str, signature: str) -> str:
+    """Recover the (lowercase) address that signed a personal_sign message"""
+    # Encode the message as it would be signed by MetaMask
+    encoded_message = encode_defunct(text=message)
+    return Account.recover_message(encoded_message, signature=signature).lower()
+
+def _valid_signature_request(address: str, signature: str, message: str) -> bool:
+    # Clean and validate address format
+    if not address or not signature or not message:
+        return False
+    return re.match(r'^0x[a-fA-F0-9]{40}$', address) is not None
+
 def verify_wallet_signature(address: str, signature: str, message: str) -> bool:
     """
     Verify wallet signature using eth_account
     """
     try:
-        # Clean and validate address
-        if not address or not signature or not message:
+        if not _valid_signature_request(address, signature, message):
             return False
-            
-        # Normalize address
-        address = address.lower()
         
-        # Validate address format
-        if not re.match(r'^0x[a-fA-F0-9]{40}$', address):
-            return False
+        # Compare addresses (case-insensitive)
+        return recover_signer(message, signature) == address.lower()
         
-        # Encode the message as it would be signed by MetaMask
-        encoded_message = encode_defunct(text=message)
+    except Exception as e:
+        logger.warning(f"Signature verification error: {e}")
+        return False
+
+def _get_signature_executor() -> Executor:
+    global _signature_executor
+    if _signature_executor is None:
+        if SIGNATURE_POOL == 'process':
+            _signature_executor = ProcessPoolExecutor(max_workers=SIGNATURE_POOL_SIZE)
+        else:
+            _signature_executor = ThreadPoolExecutor(
+                max_workers=SIGNATURE_POOL_SIZE,
+                thread_name_prefix="signature"
+            )
+    return _signature_executor
+
+def shutdown_signature_executor():
+    global _signature_executor
+    if _signature_executor is not None:
+        _signature_executor.shutdown(wait=False)
+        _signature_executor = None
+
+async def verify_wallet_signature_async(address: str, signature: str, message: str) -> bool:
+    """Verify a wallet signature without blocking the event loop, caching recovered signers"""
+    try:
+        if not _valid_signature_request(address, signature, message):
+            return False
         
-        # Recover the address from the signature
-        recovered_address = Account.recover_message(encoded_message, signature=signature)
+        key = (message, signature)
+        recovered_address = signature_cache.get(key)
+        if recovered_address is None:
+            loop = asyncio.get_running_loop()
+            recovered_address = await loop.run_in_executor(
+                _get_signature_executor(), recover_signer, message, signature
+            )
+            signature_recoveries.mark()
+            signature_cache.set(key, recovered_address)
         
-        # Compare addresses (case-insensitive)
-        return recovered_address.lower() == address
+        return recovered_address == address.lower()
         
     except Exception as e:
-        print(f"Signature verification error: {e}")
+        logger.warning(f"Signature verification error: {e}")
         return False
 
-async def authenticate_wallet(wallet_address: str, signature: Optional[str], db: Database, message: Optional[str] = None) -> tuple[User, str]:
+class InMemoryNonceStore:
+    """Single-use login nonces with a fixed TTL, evicted in expiry order"""
+
+    def __init__(self, ttl_seconds: int = LOGIN_NONCE_TTL_SECONDS, max_pending: int = LOGIN_NONCE_MAX_PENDING):
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+        # Every entry has the same TTL, so insertion order is expiry order
+        self._nonces: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._nonces:
+            _, expires_at = next(iter(self._nonces.values()))
+            if expires_at > now and len(self._nonces) <= self.max_pending:
+                break
+            self._nonces.popitem(last=False)
+
+    async def issue(self, address: str) -> tuple[str, datetime]:
+        nonce = secrets.token_hex(16)
+        self._nonces[nonce] = (address, time.monotonic() + self.ttl_seconds)
+        self._evict()
+        return nonce, datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+
+    async def consume(self, address: str, nonce: str) -> bool:
+        self._evict()
+        entry = self._nonces.pop(nonce, None)
+        return entry is not None and entry[0] == address
+
+class MongoNonceStore:
+    """
+    Login nonces shared across workers, expired by a TTL index on login_nonces.
+    
+    Each address holds at most one pending nonce (issuing again replaces it), and
+    new addresses are refused once max_pending nonces are outstanding, so the
+    unauthenticated nonce endpoint cannot grow the collection without bound.
+    """
+
+    def __init__(self, db: Database, ttl_seconds: int = LOGIN_NONCE_TTL_SECONDS, max_pending: int = LOGIN_NONCE_MAX_PENDING):
+        self.collection = db.db.login_nonces
+        self.ttl_seconds = ttl_seconds
+        self.max_pending = max_pending
+
+    async def issue(self, address: str) -> tuple[str, datetime]:
+        if await self.collection.estimated_document_count() >= self.max_pending:
+            if not await self.collection.find_one({"_id": address}, {"_id": 1}):
+                raise HTTPException(
+                    status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                    detail="Too many pending logins, try again shortly"
+                )
+        
+        nonce = secrets.token_hex(16)
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl_seconds)
+        await self.collection.update_one(
+            {"_id": address},
+            {"$set": {"nonce": nonce, "expires_at": expires_at}},
+            upsert=True
+        )
+        return nonce, expires_at
+
+    async def consume(self, address: str, nonce: str) -> bool:
+        # The TTL monitor only runs periodically, so check expiry explicitly
+        deleted = await self.collection.find_one_and_delete({
+            "_id": address,
+            "nonce": nonce,
+            "expires_at": {"$gt": datetime.utcnow()}
+        })
+        return deleted is not None
+
+def create_nonce_store(db: Database):
+    if LOGIN_NONCE_STORE == 'memory':
+        return InMemoryNonceStore()
+    return MongoNonceStore(db)
+
+def build_login_message(address: str, nonce: str) -> str:
+    return LOGIN_MESSAGE_TEMPLATE.format(address=address, nonce=nonce)
+
+def extract_login_nonce(message: str) -> Optional[str]:
+    match = re.search(r'^Nonce: ([0-9a-f]{32})$', message, re.MULTILINE)
+    return match.group(1) if match else None
+
+async def authenticate_wallet(
+    wallet_address: str,
+    signature: Optional[str],
+    db: Database,
+    message: Optional[str] = None,
+    nonce_store=None
+) -> tuple[User, str]:
     """Authenticate user with wallet address and return user + token"""
     
     # Normalize wallet address
@@ -106,7 +297,16 @@ async def authenticate_wallet(wallet_address: str, signature: Optional[str], db:
     
     # Verify signature if provided (for real wallet connections)
     if signature and message:
-        if not verify_wallet_signature(wallet_address, signature, message):
+        # Reject unknown, expired or replayed nonces before any ECDSA work
+        nonce = extract_login_nonce(message)
+        if nonce_store is not None and (nonce or REQUIRE_LOGIN_NONCE):
+            if not nonce or not await nonce_store.consume(wallet_address, nonce):
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="Invalid or expired login nonce"
+                )
+        
+        if not await verify_wallet_signature_async(wallet_address, signature, message):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid wallet signature"
@@ -121,11 +321,7 @@ async def authenticate_wallet(wallet_address: str, signature: Optional[str], db:
             )
     
     # Get or create user
-    user = await db.get_user_by_wallet(wallet_address)
-    if not user:
-        from models import UserCreate
-        user_data = UserCreate(wallet_address=wallet_address)
-        user = await db.create_user(user_data)
+    user = await db.get_or_create_user_by_wallet(wallet_address)
     
     # Create access token
     token = create_access_token(user.id, user.wallet_address)
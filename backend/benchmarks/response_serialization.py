@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: response serialization time per 1k entries
+
+Usage:
+    python benchmarks/response_serialization.py [--entries 1000] [--rounds 50]
+
+For each payload the default path builds pydantic models from stored documents
+and renders them through FastAPI's response_model handling (validation,
+jsonable_encoder, JSONResponse). The fast path, used with
+FAST_JSON_RESPONSES=true, shapes the same documents with trusted_dicts and
+renders them with FastJSONResponse.
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from models import Donation, DonationStats, Game, GlobalLeaderboardEntry
+from responses import FastJSONResponse, orjson, trusted_dicts
+
+def game_docs(n: int):
+    return [{
+        "id": f"game-{i}", "name": f"Game {i}", "description": "A fast arcade game " * 4,
+        "category": "arcade", "thumbnail": f"https://example.com/thumbs/{i}.png",
+        "play_count": i * 7, "avg_score": i % 500, "rewards": ["tokens", "nft"], "is_active": True
+    } for i in range(n)]
+
+def leaderboard_docs(n: int):
+    return [{
+        "rank": i + 1, "player": f"0x{i:040x}"[:20], "user_id": str(uuid.uuid4()),
+        "total_score": 1_000_000 - i, "games_played": i % 300, "level": 1 + i % 50
+    } for i in range(n)]
+
+def donation_docs(n: int):
+    now = datetime.utcnow()
+    return [{
+        "id": str(uuid.uuid4()), "donor_address": f"0x{i:040x}", "amount": 0.5 + i,
+        "message": "gm", "transaction_hash": f"0x{i:064x}", "status": "confirmed",
+        "timestamp": now - timedelta(seconds=i)
+    } for i in range(n)]
+
+async def default_path(model, response_type, docs, stats: bool = False) -> bytes:
+    if stats:
+        content = DonationStats(total_donations=1.0, donation_count=len(docs), recent_donations=[Donation(**d) for d in docs])
+    else:
+        content = [model(**doc) for doc in docs]
+    field = create_response_field(name="benchmark_response", type_=response_type)
+    body = await serialize_response(field=field, response_content=content)
+    return JSONResponse(body).body
+
+async def fast_path(model, docs, stats: bool = False) -> bytes:
+    if stats:
+        content = {"total_donations": 1.0, "donation_count": len(docs), "top_donor": None,
+                   "recent_donations": trusted_dicts(Donation, docs)}
+    else:
+        content = trusted_dicts(model, docs)
+    return FastJSONResponse(content).body
+
+async def measure(path, rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        await path()
+    return (time.perf_counter() - started) / rounds
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    cases = [
+        ("games/list", Game, List[Game], game_docs(args.entries), False),
+        ("leaderboard/global", GlobalLeaderboardEntry, List[GlobalLeaderboardEntry], leaderboard_docs(args.entries), False),
+        ("donations/stats", Donation, DonationStats, donation_docs(args.entries), True),
+    ]
+    scale = 1000 / args.entries
+    print(f"renderer: {'orjson' if orjson is not None else 'json (orjson not installed)'}")
+    for name, model, response_type, docs, stats in cases:
+        before = await measure(lambda: default_path(model, response_type, docs, stats), args.rounds)
+        after = await measure(lambda: fast_path(model, docs, stats), args.rounds)
+        print(f"{name:>19}: default {before * scale * 1000:.2f} ms / 1k entries, "
+              f"fast {after * scale * 1000:.2f} ms / 1k entries ({before / after:.1f}x)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after a time-to-live"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class AsyncCachedValue:
+    """
+    Single cached result of an async loader.
+
+    Concurrent callers share one in-flight load (single-flight). Values older than
+    ttl are served stale while a background refresh runs; values older than
+    max_age are never served and the caller waits for a fresh load.
+    """
+
+    def __init__(self, loader: Callable[[], Awaitable[Any]], ttl: float, max_age: Optional[float] = None):
+        self.loader = loader
+        self.ttl = ttl
+        self.max_age = ttl if max_age is None else max(ttl, max_age)
+        self._value: Any = None
+        self._loaded_at: Optional[float] = None
+        self._inflight: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.loads = 0
+
+    async def get(self) -> Any:
+        age = time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+        if age is None or age >= self.max_age:
+            self.misses += 1
+            return await self.refresh()
+
+        if age >= self.ttl:
+            self.stale_hits += 1
+            self._start_load()
+        else:
+            self.hits += 1
+        return self._value
+
+    async def refresh(self) -> Any:
+        """Load a fresh value, joining an in-flight load if there is one"""
+        # Shield so a cancelled request does not abort the load other callers share
+        return await asyncio.shield(self._start_load())
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _start_load(self) -> asyncio.Task:
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._load())
+            self._inflight.add_done_callback(self._log_failure)
+        return self._inflight
+
+    async def _load(self) -> Any:
+        try:
+            value = await self.loader()
+            self._value = value
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+            return value
+        finally:
+            self._inflight = None
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Cached value load failed: {task.exception()}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "age_seconds": round(time.monotonic() - self._loaded_at, 3) if self._loaded_at is not None else None,
+            "ttl_seconds": self.ttl,
+            "max_age_seconds": self.max_age,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "loads": self.loads
+        }
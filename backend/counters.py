@@ -0,0 +1,51 @@
+"""
+HyperLogLog helpers for counting distinct active users per day.
+
+Registers are stored as fields of a Mongo document and updated with $max, which
+is atomic and order-independent, so every worker can feed the same sketch and
+the distinct count is read back from a single document.
+"""
+
+import hashlib
+import math
+from datetime import datetime
+from typing import Dict, Iterable
+
+HLL_PRECISION = 10
+HLL_REGISTERS = 1 << HLL_PRECISION
+_HASH_BITS = 64
+_REMAINDER_BITS = _HASH_BITS - HLL_PRECISION
+
+GLOBAL_COUNTERS_ID = "global"
+
+def active_counter_id(day: datetime) -> str:
+    return f"active:{day.strftime('%Y-%m-%d')}"
+
+def hll_register(member: str) -> tuple[int, int]:
+    """Register index and rank (position of the first 1-bit) for a member"""
+    hashed = int.from_bytes(hashlib.sha1(member.encode()).digest()[:8], "big")
+    index = hashed >> _REMAINDER_BITS
+    remainder = hashed & ((1 << _REMAINDER_BITS) - 1)
+    return index, _REMAINDER_BITS - remainder.bit_length() + 1
+
+def hll_registers(members: Iterable[str]) -> Dict[str, int]:
+    registers: Dict[str, int] = {}
+    for member in members:
+        index, rank = hll_register(member)
+        key = str(index)
+        if rank > registers.get(key, 0):
+            registers[key] = rank
+    return registers
+
+def hll_estimate(registers: Dict[str, int]) -> int:
+    """Distinct-count estimate from stored registers (missing registers are 0)"""
+    m = HLL_REGISTERS
+    alpha = 0.7213 / (1 + 1.079 / m)
+    zeros = m - len(registers)
+    harmonic = zeros + sum(2.0 ** -rank for rank in registers.values())
+    estimate = alpha * m * m / harmonic
+
+    # Small-range correction (linear counting)
+    if estimate <= 2.5 * m and zeros > 0:
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
@@ -1,21 +1,184 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne, monitoring
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
+import asyncio
 import os
+import uuid
 import logging
 from models import *
+from cache import AsyncCachedValue, TTLCache
+from responses import trusted_dicts
+from indexes import ensure_indexes
+from counters import GLOBAL_COUNTERS_ID, active_counter_id, hll_estimate, hll_register, hll_registers
+from leaderboard import GLOBAL_KEY, LeaderboardBackend, game_key
+from locks import MongoLease
 
 logger = logging.getLogger(__name__)
 
+# Connection pool configuration
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+
+# Authenticated user cache configuration
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '30'))
+
+# Upper bound on how long the daily challenge list is served from memory
+CHALLENGE_CACHE_MAX_TTL_SECONDS = float(os.environ.get('CHALLENGE_CACHE_MAX_TTL_SECONDS', '300'))
+
+# Platform stats are refreshed in the background and served stale-while-revalidate
+PLATFORM_STATS_REFRESH_SECONDS = float(os.environ.get('PLATFORM_STATS_REFRESH_SECONDS', '30'))
+PLATFORM_STATS_MAX_AGE_SECONDS = float(os.environ.get('PLATFORM_STATS_MAX_AGE_SECONDS', '300'))
+
+# Donation stats are kept as running totals; the in-process copy is refreshed this often
+DONATION_STATS_TTL_SECONDS = float(os.environ.get('DONATION_STATS_TTL_SECONDS', '10'))
+DONATION_STATS_REBUILD_LEASE_SECONDS = float(os.environ.get('DONATION_STATS_REBUILD_LEASE_SECONDS', '300'))
+RECENT_DONATIONS_LIMIT = 10
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool events so pool usage can be exposed"""
+
+    def __init__(self):
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checked_out = 0
+        self.checkout_failures = 0
+        self.pools_cleared = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "max_idle_time_ms": MONGO_MAX_IDLE_TIME_MS,
+            "open_connections": self.connections_created - self.connections_closed,
+            "in_use": self.checked_out,
+            "connections_created": self.connections_created,
+            "connections_closed": self.connections_closed,
+            "checkout_failures": self.checkout_failures,
+            "pools_cleared": self.pools_cleared
+        }
+
+pool_metrics = PoolMetrics()
+
+def next_utc_midnight() -> datetime:
+    """Start of the next UTC day, when daily challenges rotate"""
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=1)
+
+def calculate_level(total_score: int) -> int:
+    """Level up every 1000 points (mirrored by the pipeline in update_user_stats)"""
+    return max(1, total_score // 1000)
+
+def player_name_expr(username: str, wallet_address: str) -> Dict[str, Any]:
+    """Aggregation expression for `username or wallet_address` (username defaults to "")"""
+    return {"$cond": [
+        {"$gt": [{"$ifNull": [username, ""]}, ""]},
+        username,
+        wallet_address
+    ]}
+
+def create_client(mongo_url: str) -> AsyncIOMotorClient:
+    """Create the app-wide Mongo client with a configured connection pool"""
+    return AsyncIOMotorClient(
+        mongo_url,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        event_listeners=[pool_metrics]
+    )
+
 class Database:
-    def __init__(self, client: AsyncIOMotorClient):
+    def __init__(self, client: AsyncIOMotorClient, leaderboard: Optional[LeaderboardBackend] = None):
         self.client = client
         self.db = client[os.environ.get('DB_NAME', 'moangem')]
+        # Optional sorted-set engine; None keeps every leaderboard read on Mongo
+        self.leaderboard = leaderboard
+        self.user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+        self.challenge_cache = TTLCache(maxsize=1, ttl=CHALLENGE_CACHE_MAX_TTL_SECONDS)
+        self.platform_stats_cache = AsyncCachedValue(
+            self.compute_platform_stats,
+            ttl=PLATFORM_STATS_REFRESH_SECONDS,
+            max_age=PLATFORM_STATS_MAX_AGE_SECONDS
+        )
+        self.donation_stats_cache = AsyncCachedValue(self._load_donation_stats, ttl=DONATION_STATS_TTL_SECONDS)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        return pool_metrics.snapshot()
+
+    async def ensure_indexes(self):
+        """Create indexes for all hot collections (idempotent)"""
+        await ensure_indexes(self.db)
         
     # User Operations
     async def create_user(self, user_data: UserCreate) -> User:
         user = User(**user_data.dict())
         result = await self.db.users.insert_one(user.dict())
+        self.user_cache.invalidate(user.id)
+        await self._inc_platform_counters(total_players=1)
+        return user
+    
+    async def get_or_create_user_by_wallet(self, wallet_address: str) -> User:
+        """Find the user for a wallet, creating it if missing, in one atomic upsert"""
+        wallet_address = wallet_address.lower()
+        new_user = User(wallet_address=wallet_address)
+        defaults = new_user.dict()
+        del defaults["wallet_address"]
+        
+        # A concurrent upsert for the same wallet can lose the race on the unique
+        # index; the retry then matches the winner's document
+        for attempt in range(2):
+            try:
+                user_data = await self.db.users.find_one_and_update(
+                    {"wallet_address": wallet_address},
+                    {"$setOnInsert": defaults},
+                    upsert=True,
+                    return_document=ReturnDocument.AFTER
+                )
+                break
+            except DuplicateKeyError:
+                if attempt:
+                    raise
+        
+        user = User(**user_data)
+        if user.id == new_user.id:
+            self.user_cache.invalidate(user.id)
+            await self._inc_platform_counters(total_players=1)
         return user
     
     async def get_user_by_wallet(self, wallet_address: str) -> Optional[User]:
@@ -30,87 +193,286 @@ class Database:
             return User(**user_data)
         return None
     
-    async def update_user_stats(self, user_id: str, score: int, tokens: float) -> bool:
-        update_data = {
-            "$inc": {
-                "total_score": score,
-                "games_played": 1,
-                "tokens_earned": tokens
-            },
-            "$set": {
+    async def get_cached_user(self, user_id: str) -> Optional[User]:
+        """Get user by id, serving repeated lookups from the in-process cache"""
+        user = self.user_cache.get(user_id)
+        if user is None:
+            user = await self.get_user_by_id(user_id)
+            if user:
+                self.user_cache.set(user_id, user)
+        return user
+    
+    async def update_user_stats(self, user_id: str, score: int, tokens: float, games: int = 1) -> Optional[User]:
+        """Apply a game result and recompute level in one atomic round trip"""
+        pipeline = [
+            {"$set": {
+                "total_score": {"$add": [{"$ifNull": ["$total_score", 0]}, score]},
+                "games_played": {"$add": [{"$ifNull": ["$games_played", 0]}, games]},
+                "tokens_earned": {"$add": [{"$ifNull": ["$tokens_earned", 0]}, tokens]},
                 "last_active": datetime.utcnow()
-            }
-        }
+            }},
+            # Level up every 1000 points
+            {"$set": {
+                "level": {"$max": [1, {"$toInt": {"$floor": {"$divide": ["$total_score", 1000]}}}]}
+            }}
+        ]
         
-        result = await self.db.users.update_one({"id": user_id}, update_data)
+        user_data, _ = await asyncio.gather(
+            self.db.users.find_one_and_update(
+                {"id": user_id},
+                pipeline,
+                return_document=ReturnDocument.AFTER
+            ),
+            self._track_active_user(user_id)
+        )
         
-        # Update level based on total score
-        user = await self.get_user_by_id(user_id)
-        if user:
-            new_level = max(1, user.total_score // 1000)  # Level up every 1000 points
-            if new_level != user.level:
-                await self.db.users.update_one(
-                    {"id": user_id}, 
-                    {"$set": {"level": new_level}}
+        # Invalidate rather than prime: with concurrent submits the reply that
+        # resolves last may not be the newest document
+        self.user_cache.invalidate(user_id)
+        return User(**user_data) if user_data else None
+    
+    # Game Session Operations
+    async def create_game_session(
+        self,
+        user_id: str,
+        session_data: GameSessionCreate,
+        player: Optional[str] = None
+    ) -> tuple[GameSession, Optional[User], bool]:
+        """Record a session; returns the session, the updated user and whether it is a new high score"""
+        session = self._build_session(user_id, session_data)
+        
+        await self.db.game_sessions.insert_one(session.dict())
+        
+        if player is None:
+            player = await self._player_name(user_id)
+        
+        # Derived writes are independent of each other, so issue them concurrently
+        _, previous_best, user, _ = await asyncio.gather(
+            # Per-game totals
+            self.db.game_stats.update_one(
+                {"_id": session.game_id},
+                {"$inc": {"play_count": 1, "score_sum": session.score}},
+                upsert=True
+            ),
+            # Per-user best score used by leaderboards and high scores
+            self.db.user_game_bests.find_one_and_update(
+                {"user_id": user_id, "game_id": session.game_id},
+                {
+                    "$max": {"best_score": session.score},
+                    "$inc": {"games": 1},
+                    "$set": {"player": player}
+                },
+                projection={"best_score": 1},
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            ),
+            self.update_user_stats(user_id, session.score, session.tokens_earned),
+            self._inc_platform_counters(total_games_played=1, total_tokens=session.tokens_earned)
+        )
+        is_new_high_score = session.score > (previous_best["best_score"] if previous_best else 0)
+        
+        # Feed the sorted-set leaderboards
+        if self.leaderboard is not None:
+            await self.leaderboard.zincrby(GLOBAL_KEY, user_id, session.score)
+            await self.leaderboard.zadd(game_key(session.game_id), user_id, session.score, gt=True)
+        
+        return session, user, is_new_high_score
+    
+    async def create_game_sessions_batch(
+        self,
+        user_id: str,
+        sessions_data: List[GameSessionCreate],
+        player: Optional[str] = None
+    ) -> tuple[List[GameSession], Optional[User], List[bool]]:
+        """Record many sessions with one insert and one write per derived collection/game"""
+        sessions = [self._build_session(user_id, session_data) for session_data in sessions_data]
+        
+        await self.db.game_sessions.insert_many([session.dict() for session in sessions])
+        
+        if player is None:
+            player = await self._player_name(user_id)
+        
+        # Aggregate the batch per game
+        per_game: Dict[str, Dict[str, int]] = {}
+        for session in sessions:
+            totals = per_game.setdefault(session.game_id, {"count": 0, "score_sum": 0, "best": 0})
+            totals["count"] += 1
+            totals["score_sum"] += session.score
+            totals["best"] = max(totals["best"], session.score)
+        
+        total_score = sum(session.score for session in sessions)
+        total_tokens = sum(session.tokens_earned for session in sessions)
+        game_ids = list(per_game)
+        
+        results = await asyncio.gather(
+            self.db.game_stats.bulk_write([
+                UpdateOne(
+                    {"_id": game_id},
+                    {"$inc": {"play_count": totals["count"], "score_sum": totals["score_sum"]}},
+                    upsert=True
+                )
+                for game_id, totals in per_game.items()
+            ]),
+            self.update_user_stats(user_id, total_score, total_tokens, games=len(sessions)),
+            self._inc_platform_counters(total_games_played=len(sessions), total_tokens=total_tokens),
+            *[
+                self.db.user_game_bests.find_one_and_update(
+                    {"user_id": user_id, "game_id": game_id},
+                    {
+                        "$max": {"best_score": per_game[game_id]["best"]},
+                        "$inc": {"games": per_game[game_id]["count"]},
+                        "$set": {"player": player}
+                    },
+                    projection={"best_score": 1},
+                    upsert=True,
+                    return_document=ReturnDocument.BEFORE
                 )
+                for game_id in game_ids
+            ]
+        )
+        user = results[1]
+        previous_bests = results[3:]
+        
+        # One high-score comparison per game, then walk the batch in order
+        running_best = {
+            game_id: previous["best_score"] if previous else 0
+            for game_id, previous in zip(game_ids, previous_bests)
+        }
+        new_high_scores = []
+        for session in sessions:
+            is_new = session.score > running_best[session.game_id]
+            if is_new:
+                running_best[session.game_id] = session.score
+            new_high_scores.append(is_new)
+        
+        # Feed the sorted-set leaderboards
+        if self.leaderboard is not None:
+            await self.leaderboard.zincrby(GLOBAL_KEY, user_id, total_score)
+            for game_id, totals in per_game.items():
+                await self.leaderboard.zadd(game_key(game_id), user_id, totals["best"], gt=True)
         
-        return result.modified_count > 0
+        return sessions, user, new_high_scores
     
-    # Game Session Operations
-    async def create_game_session(self, user_id: str, session_data: GameSessionCreate) -> GameSession:
+    def _build_session(self, user_id: str, session_data: GameSessionCreate) -> GameSession:
         # Calculate tokens earned (10 points = 1 token)
-        tokens_earned = session_data.score / 10.0
-        
-        session = GameSession(
+        return GameSession(
             user_id=user_id,
             game_id=session_data.game_id,
             score=session_data.score,
-            tokens_earned=tokens_earned,
+            tokens_earned=session_data.score / 10.0,
             duration=session_data.duration,
             session_data=session_data.session_data
         )
+    
+    async def _player_name(self, user_id: str) -> str:
+        user = await self.get_cached_user(user_id)
+        return (user.username or user.wallet_address) if user else user_id
+    
+    async def get_games_with_stats(self, as_dicts: bool = False) -> List[Game]:
+        """
+        List games joined with their materialized play count and average score
+        (as_dicts returns unvalidated dicts shaped like Game for fast serialization)
+        """
+        pipeline = [
+            {"$lookup": {
+                "from": "game_stats",
+                "localField": "id",
+                "foreignField": "_id",
+                "as": "stats"
+            }}
+        ]
+        games = await self.db.games.aggregate(pipeline).to_list(100)
         
-        await self.db.game_sessions.insert_one(session.dict())
-        
-        # Update user stats
-        await self.update_user_stats(user_id, session_data.score, tokens_earned)
+        for game in games:
+            stats = game.pop("stats")
+            play_count = stats[0]["play_count"] if stats else 0
+            game["play_count"] = play_count
+            game["avg_score"] = int(stats[0]["score_sum"] / play_count) if play_count else 0
         
-        return session
+        if as_dicts:
+            return trusted_dicts(Game, games)
+        return [Game(**game) for game in games]
+    
+    async def rebuild_game_stats(self):
+        """Recompute game_stats from the full session history (backfill)"""
+        pipeline = [
+            {"$group": {
+                "_id": "$game_id",
+                "play_count": {"$sum": 1},
+                "score_sum": {"$sum": "$score"}
+            }},
+            {"$merge": {"into": "game_stats", "whenMatched": "replace", "whenNotMatched": "insert"}}
+        ]
+        await self.db.game_sessions.aggregate(pipeline).to_list(None)
     
     async def get_user_high_score(self, user_id: str, game_id: str) -> int:
-        result = await self.db.game_sessions.find_one(
+        result = await self.db.user_game_bests.find_one(
             {"user_id": user_id, "game_id": game_id},
-            sort=[("score", -1)]
+            {"best_score": 1}
         )
-        return result["score"] if result else 0
+        return result["best_score"] if result else 0
     
-    # Leaderboard Operations
-    async def get_game_leaderboard(self, game_id: str, limit: int = 10) -> List[LeaderboardEntry]:
+    async def rebuild_user_game_bests(self):
+        """Recompute user_game_bests from the full session history (backfill)"""
         pipeline = [
-            {"$match": {"game_id": game_id}},
             {"$group": {
-                "_id": "$user_id",
+                "_id": {"user_id": "$user_id", "game_id": "$game_id"},
                 "best_score": {"$max": "$score"},
-                "games_played": {"$sum": 1}
+                "games": {"$sum": 1}
             }},
             {"$lookup": {
                 "from": "users",
-                "localField": "_id",
+                "localField": "_id.user_id",
                 "foreignField": "id",
                 "as": "user"
             }},
             {"$unwind": "$user"},
             {"$project": {
-                "user_id": "$_id",
-                "player": {"$ifNull": ["$user.username", "$user.wallet_address"]},
-                "score": "$best_score",
-                "games": "$games_played"
+                "_id": 0,
+                "user_id": "$_id.user_id",
+                "game_id": "$_id.game_id",
+                "best_score": 1,
+                "games": 1,
+                "player": player_name_expr("$user.username", "$user.wallet_address")
             }},
-            {"$sort": {"score": -1}},
-            {"$limit": limit}
+            {"$merge": {
+                "into": "user_game_bests",
+                "on": ["user_id", "game_id"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
         ]
+        await self.db.game_sessions.aggregate(pipeline).to_list(None)
+    
+    # Leaderboard Operations
+    async def warm_leaderboards(self):
+        """Load the leaderboard engine from Mongo when it starts out empty"""
+        if self.leaderboard is None or await self.leaderboard.zcard(GLOBAL_KEY) > 0:
+            return
         
-        results = await self.db.game_sessions.aggregate(pipeline).to_list(limit)
+        async for user in self.db.users.find({}, {"id": 1, "total_score": 1}):
+            await self.leaderboard.zadd(GLOBAL_KEY, user["id"], user.get("total_score", 0), gt=True)
+        
+        async for best in self.db.user_game_bests.find({}, {"user_id": 1, "game_id": 1, "best_score": 1}):
+            await self.leaderboard.zadd(game_key(best["game_id"]), best["user_id"], best["best_score"], gt=True)
+    
+    async def get_game_leaderboard(self, game_id: str, limit: int = 10) -> List[LeaderboardEntry]:
+        projection = {"user_id": 1, "player": 1, "best_score": 1, "games": 1}
+        ranked = await self.leaderboard.zrevrange(game_key(game_id), 0, limit - 1) if self.leaderboard else []
+        
+        if ranked:
+            user_ids = [user_id for user_id, _ in ranked]
+            bests = await self.db.user_game_bests.find(
+                {"game_id": game_id, "user_id": {"$in": user_ids}},
+                projection
+            ).to_list(limit)
+            by_user = {best["user_id"]: best for best in bests}
+            results = [by_user[user_id] for user_id in user_ids if user_id in by_user]
+        else:
+            results = await self.db.user_game_bests.find(
+                {"game_id": game_id},
+                projection
+            ).sort([("best_score", -1), ("user_id", -1)]).limit(limit).to_list(limit)
         
         leaderboard = []
         for i, result in enumerate(results):
@@ -118,19 +480,51 @@ class Database:
                 rank=i + 1,
                 player=result["player"][:20] if len(result["player"]) > 20 else result["player"],
                 user_id=result["user_id"],
-                score=result["score"],
+                score=result["best_score"],
                 games=result["games"]
             ))
         
         return leaderboard
     
-    async def get_global_leaderboard(self, limit: int = 10) -> List[GlobalLeaderboardEntry]:
+    async def get_user_rank(self, user: User) -> int:
+        """1-based global rank (equal scores share a rank), from the engine or an indexed count"""
+        if self.leaderboard is not None:
+            score = await self.leaderboard.zscore(GLOBAL_KEY, user.id)
+            if score is not None:
+                return await self.leaderboard.zcount_above(GLOBAL_KEY, score) + 1
+        
+        higher = await self.db.users.count_documents({"total_score": {"$gt": user.total_score}})
+        return higher + 1
+    
+    async def get_global_leaderboard(self, limit: int = 10, as_dicts: bool = False) -> List[GlobalLeaderboardEntry]:
+        ranked = await self.leaderboard.zrevrange(GLOBAL_KEY, 0, limit - 1) if self.leaderboard else []
+        
+        if ranked:
+            user_ids = [user_id for user_id, _ in ranked]
+            users = await self.db.users.find(
+                {"id": {"$in": user_ids}},
+                {"id": 1, "username": 1, "wallet_address": 1, "total_score": 1, "games_played": 1, "level": 1}
+            ).to_list(limit)
+            by_id = {user["id"]: user for user in users}
+            results = [
+                {
+                    "user_id": user_id,
+                    "player": by_id[user_id].get("username") or by_id[user_id]["wallet_address"],
+                    "total_score": by_id[user_id]["total_score"],
+                    "games_played": by_id[user_id]["games_played"],
+                    "level": by_id[user_id]["level"]
+                }
+                for user_id in user_ids if user_id in by_id
+            ]
+            return self._global_leaderboard_entries(results, as_dicts)
+        
         pipeline = [
-            {"$sort": {"total_score": -1}},
+            # Same tie order as the engine's ZREVRANGE
+            {"$sort": {"total_score": -1, "id": -1}},
             {"$limit": limit},
             {"$project": {
                 "user_id": "$id",
-                "player": {"$ifNull": ["$username", "$wallet_address"]},
+                "player": player_name_expr("$username", "$wallet_address"),
                 "total_score": 1,
                 "games_played": 1,
                 "level": 1
@@ -138,30 +532,47 @@ class Database:
         ]
         
         results = await self.db.users.aggregate(pipeline).to_list(limit)
-        
+        return self._global_leaderboard_entries(results, as_dicts)
+    
+    def _global_leaderboard_entries(self, results: List[Dict[str, Any]], as_dicts: bool = False) -> List[GlobalLeaderboardEntry]:
         leaderboard = []
         for i, result in enumerate(results):
-            leaderboard.append(GlobalLeaderboardEntry(
-                rank=i + 1,
-                player=result["player"][:20] if len(result["player"]) > 20 else result["player"],
-                user_id=result["user_id"],
-                total_score=result["total_score"],
-                games_played=result["games_played"],
-                level=result["level"]
-            ))
+            entry = {
+                "rank": i + 1,
+                "player": result["player"][:20] if len(result["player"]) > 20 else result["player"],
+                "user_id": result["user_id"],
+                "total_score": result["total_score"],
+                "games_played": result["games_played"],
+                "level": result["level"]
+            }
+            leaderboard.append(entry if as_dicts else GlobalLeaderboardEntry(**entry))
         
         return leaderboard
     
     # Challenge Operations
     async def get_daily_challenges(self) -> List[Challenge]:
-        now = datetime.utcnow()
-        challenges = await self.db.challenges.find({
-            "is_daily": True,
-            "is_active": True,
-            "expires_at": {"$gt": now}
-        }).to_list(100)
+        """Active daily challenges, served from memory until the earliest one expires"""
+        challenges = self.challenge_cache.get("daily")
+        if challenges is None:
+            now = datetime.utcnow()
+            challenges_data = await self.db.challenges.find({
+                "is_daily": True,
+                "is_active": True,
+                "expires_at": {"$gt": now}
+            }).to_list(100)
+            challenges = [Challenge(**challenge) for challenge in challenges_data]
+            
+            ttl = min(
+                ((challenge.expires_at - now).total_seconds() for challenge in challenges),
+                default=CHALLENGE_CACHE_MAX_TTL_SECONDS
+            )
+            self.challenge_cache.set("daily", challenges, ttl=ttl)
         
-        return [Challenge(**challenge) for challenge in challenges]
+        # Callers fill in per-user progress, so never hand out the cached objects
+        return [challenge.copy() for challenge in challenges]
+    
+    def invalidate_challenge_cache(self):
+        self.challenge_cache.invalidate("daily")
     
     async def create_daily_challenges(self):
         """Create default daily challenges if none exist"""
@@ -172,7 +583,7 @@ class Database:
         })
         
         if existing == 0:
-            tomorrow = datetime.utcnow() + timedelta(days=1)
+            tomorrow = next_utc_midnight()
             default_challenges = [
                 Challenge(
                     title="Snake Streak",
@@ -202,6 +613,17 @@ class Database:
             
             for challenge in default_challenges:
                 await self.db.challenges.insert_one(challenge.dict())
+            self.invalidate_challenge_cache()
+    
+    async def rotate_daily_challenges(self):
+        """Deactivate expired daily challenges in bulk and create the current day's set"""
+        result = await self.db.challenges.update_many(
+            {"is_daily": True, "is_active": True, "expires_at": {"$lte": datetime.utcnow()}},
+            {"$set": {"is_active": False}}
+        )
+        if result.modified_count:
+            logger.info(f"Expired {result.modified_count} daily challenges")
+        await self.create_daily_challenges()
     
     async def get_user_challenge_progress(self, user_id: str, challenge_id: str) -> Optional[UserChallenge]:
         challenge_data = await self.db.user_challenges.find_one({
@@ -212,6 +634,18 @@ class Database:
             return UserChallenge(**challenge_data)
         return None
     
+    async def get_user_challenges_progress(self, user_id: str, challenge_ids: List[str]) -> Dict[str, UserChallenge]:
+        """Fetch a user's progress for many challenges in one query, keyed by challenge id"""
+        if not challenge_ids:
+            return {}
+        
+        challenges_data = await self.db.user_challenges.find({
+            "user_id": user_id,
+            "challenge_id": {"$in": challenge_ids}
+        }).to_list(len(challenge_ids))
+        
+        return {data["challenge_id"]: UserChallenge(**data) for data in challenges_data}
+    
     async def update_challenge_progress(self, user_id: str, challenge_id: str, progress: int) -> UserChallenge:
         existing = await self.get_user_challenge_progress(user_id, challenge_id)
         
@@ -235,32 +669,110 @@ class Database:
     
     # Platform Stats
     async def get_platform_stats(self) -> PlatformStats:
-        total_users = await self.db.users.count_documents({})
-        total_sessions = await self.db.game_sessions.count_documents({})
+        return await self.platform_stats_cache.get()
+    
+    async def compute_platform_stats(self) -> PlatformStats:
+        today = datetime.utcnow()
+        active_id = active_counter_id(today)
         
-        # Calculate total rewards
-        pipeline = [
-            {"$group": {"_id": None, "total_tokens": {"$sum": "$tokens_earned"}}}
-        ]
-        reward_result = await self.db.users.aggregate(pipeline).to_list(1)
-        total_rewards = reward_result[0]["total_tokens"] if reward_result else 0
+        docs = await self.db.platform_counters.find(
+            {"_id": {"$in": [GLOBAL_COUNTERS_ID, active_id]}}
+        ).to_list(2)
+        by_id = {doc["_id"]: doc for doc in docs}
         
-        # Active players today
-        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-        active_today = await self.db.users.count_documents({
-            "last_active": {"$gte": today}
-        })
+        counters = by_id.get(GLOBAL_COUNTERS_ID)
+        if counters is None or not counters.get("seeded"):
+            # Normally seeded by initialize_default_data before serving
+            await self.seed_platform_counters()
+            return await self.compute_platform_stats()
+        
+        total_rewards = counters.get("total_tokens", 0)
+        active_today = hll_estimate(by_id.get(active_id, {}).get("r", {}))
         
         return PlatformStats(
-            total_players=total_users,
-            total_games_played=total_sessions,
+            total_players=counters.get("total_players", 0),
+            total_games_played=counters.get("total_games_played", 0),
             total_rewards_distributed=f"${total_rewards * 0.1:.1f}K",  # Mock USD value
             active_players_today=active_today
         )
     
+    async def _inc_platform_counters(self, **amounts):
+        # Never upsert: increments before seeding are already in the seed's counts,
+        # and an upserted {total_players: 1} would look like a seeded document
+        await self.db.platform_counters.update_one(
+            {"_id": GLOBAL_COUNTERS_ID, "seeded": True},
+            {"$inc": amounts}
+        )
+    
+    async def seed_platform_counters(self):
+        """Seed the global counters from the source collections once per database"""
+        if await self.db.platform_counters.find_one({"_id": GLOBAL_COUNTERS_ID, "seeded": True}, {"_id": 1}):
+            return
+        await self.reconcile_platform_counters(apply=True)
+    
+    async def _track_active_user(self, user_id: str):
+        """Add a user to today's HyperLogLog sketch of active players"""
+        now = datetime.utcnow()
+        index, rank = hll_register(user_id)
+        await self.db.platform_counters.update_one(
+            {"_id": active_counter_id(now)},
+            {
+                "$max": {f"r.{index}": rank},
+                "$setOnInsert": {"expires_at": next_utc_midnight() + timedelta(days=7)}
+            },
+            upsert=True
+        )
+    
+    async def reconcile_platform_counters(self, apply: bool = False) -> Dict[str, Any]:
+        """Recompute platform counters from the source collections and report drift"""
+        reward_result = await self.db.users.aggregate([
+            {"$group": {"_id": None, "total_tokens": {"$sum": "$tokens_earned"}}}
+        ]).to_list(1)
+        actual = {
+            "total_players": await self.db.users.count_documents({}),
+            "total_games_played": await self.db.game_sessions.count_documents({}),
+            "total_tokens": reward_result[0]["total_tokens"] if reward_result else 0
+        }
+        
+        current = await self.db.platform_counters.find_one({"_id": GLOBAL_COUNTERS_ID}) or {}
+        drift = {key: value - current.get(key, 0) for key, value in actual.items()}
+        
+        # Rebuild today's active-player sketch from last_active
+        now = datetime.utcnow()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        active_ids = [
+            user["id"] async for user in self.db.users.find({"last_active": {"$gte": today}}, {"id": 1})
+        ]
+        registers = hll_registers(active_ids)
+        
+        if apply:
+            # Increments between the counts above and this write are overwritten;
+            # the drift report shows how far apart they were
+            await self.db.platform_counters.update_one(
+                {"_id": GLOBAL_COUNTERS_ID},
+                {"$set": {**actual, "seeded": True}},
+                upsert=True
+            )
+            if registers:
+                await self.db.platform_counters.update_one(
+                    {"_id": active_counter_id(now)},
+                    {
+                        "$max": {f"r.{index}": rank for index, rank in registers.items()},
+                        "$setOnInsert": {"expires_at": next_utc_midnight() + timedelta(days=7)}
+                    },
+                    upsert=True
+                )
+        
+        return {
+            "counters": actual,
+            "drift": drift,
+            "active_today": {"exact": len(active_ids), "estimated": hll_estimate(registers)},
+            "applied": apply
+        }
+    
     # Initialize default data
     async def initialize_default_data(self):
-        """Initialize games and challenges"""
+        """Initialize games (daily challenges are rotated by ChallengeScheduler)"""
         # Create default games if they don't exist
         games_count = await self.db.games.count_documents({})
         if games_count == 0:
@@ -304,10 +816,27 @@ class Database:
             ]
             
             for game in default_games:
-                await self.db.games.insert_one(game.dict())
+                # Upsert so workers seeding an empty database at once do not collide
+                # on the unique id index
+                await self.db.games.update_one(
+                    {"id": game.id},
+                    {"$setOnInsert": game.dict()},
+                    upsert=True
+                )
         
-        # Create daily challenges
-        await self.create_daily_challenges()
+        # Backfill materialized game stats on first run after upgrade
+        if await self.db.game_stats.estimated_document_count() == 0:
+            if await self.db.game_sessions.estimated_document_count() > 0:
+                await self.rebuild_game_stats()
+        
+        if await self.db.user_game_bests.estimated_document_count() == 0:
+            if await self.db.game_sessions.estimated_document_count() > 0:
+                await self.rebuild_user_game_bests()
+        
+        # Seed running totals before serving (and before the donation watcher starts)
+        # so no increment lands in an unseeded document
+        await self.seed_platform_counters()
+        await self.seed_donation_stats()
 
     # Donation Methods
     async def create_donation(self, donation):
@@ -344,16 +873,76 @@ class Database:
             raise
 
     async def update_donation_status(self, tx_hash: str, status: str):
-        """Update donation status"""
+        """Update donation status, folding new confirmations into the running totals"""
         try:
-            await self.db.donations.update_one(
-                {"transaction_hash": tx_hash},
-                {"$set": {"status": status}}
+            if status != "confirmed":
+                await self.db.donations.update_one(
+                    {"transaction_hash": tx_hash},
+                    {"$set": {"status": status}}
+                )
+                return
+            
+            # Only the write that performs the transition sees a document here
+            donation = await self.db.donations.find_one_and_update(
+                {"transaction_hash": tx_hash, "status": {"$ne": "confirmed"}},
+                {"$set": {"status": "confirmed"}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
             )
+            if donation:
+                await self._record_confirmed_donation(donation)
         except Exception as e:
             logger.error(f"Error updating donation status: {e}")
             raise
 
+    async def _record_confirmed_donation(self, donation: Dict[str, Any]):
+        await self._record_confirmed_donations([donation])
+
+    async def _record_confirmed_donations(self, donations: List[Dict[str, Any]]):
+        if not donations:
+            return
+        
+        per_donor: Dict[str, float] = {}
+        for donation in donations:
+            per_donor[donation["donor_address"]] = per_donor.get(donation["donor_address"], 0) + donation["amount"]
+        
+        await self.db.donor_totals.bulk_write([
+            UpdateOne({"_id": donor}, {"$inc": {"total_donated": amount}}, upsert=True)
+            for donor, amount in per_donor.items()
+        ], ordered=False)
+        donors = await self.db.donor_totals.find({"_id": {"$in": list(per_donor)}}).to_list(len(per_donor))
+        
+        # Never upsert: an unseeded document would never be backfilled from history,
+        # and confirmations before seeding are already in the rebuild's totals
+        await self.db.donation_totals.update_one(
+            {"_id": "global", "seeded": True},
+            {
+                "$inc": {
+                    "total_donations": sum(donation["amount"] for donation in donations),
+                    "donation_count": len(donations)
+                },
+                # Bounded ring of the most recent confirmed donations
+                "$push": {"recent_donations": {
+                    "$each": donations,
+                    "$sort": {"timestamp": -1},
+                    "$slice": RECENT_DONATIONS_LIMIT
+                }}
+            }
+        )
+        
+        # Replace the top donor only if the biggest donor in this batch has overtaken them
+        if donors:
+            leader = max(donors, key=lambda donor: donor["total_donated"])
+            await self.db.donation_totals.update_one(
+                {"_id": "global", "seeded": True, "$or": [
+                    {"top_donor_total": {"$lt": leader["total_donated"]}},
+                    {"top_donor_total": {"$exists": False}}
+                ]},
+                {"$set": {"top_donor": leader["_id"], "top_donor_total": leader["total_donated"]}}
+            )
+        
+        self.donation_stats_cache.invalidate()
+
     async def get_donation_by_tx(self, tx_hash: str):
         """Get donation by transaction hash"""
         try:
@@ -363,53 +952,102 @@ class Database:
             logger.error(f"Error getting donation by tx: {e}")
             raise
 
-    async def get_donations_stats(self):
-        """Get donation statistics"""
+    async def update_donation_statuses(self, statuses: Dict[str, str]):
+        """
+        Apply many status transitions with one bulk write, then fold the new
+        confirmations into the running totals with a fixed number of writes
+        """
+        if not statuses:
+            return
         try:
-            pipeline = [
-                {"$match": {"status": "confirmed"}},
-                {"$group": {
-                    "_id": None,
-                    "total_donations": {"$sum": "$amount"},
-                    "donation_count": {"$sum": 1}
-                }}
+            # Tag the confirmations this write performs, so a donation confirmed
+            # concurrently elsewhere is never counted twice
+            batch_id = uuid.uuid4().hex
+            updates = [
+                UpdateOne(
+                    {"transaction_hash": tx_hash, "status": {"$ne": status}},
+                    {"$set": {"status": status, **({"confirmed_batch": batch_id} if status == "confirmed" else {})}}
+                )
+                for tx_hash, status in statuses.items()
             ]
+            result = await self.db.donations.bulk_write(updates, ordered=False)
             
-            result = await self.db.donations.aggregate(pipeline).to_list(1)
+            confirmed_hashes = [tx_hash for tx_hash, status in statuses.items() if status == "confirmed"]
+            if not confirmed_hashes or not result.modified_count:
+                return
             
-            if result:
-                stats = result[0]
-                # Get top donor
-                top_donor_pipeline = [
-                    {"$match": {"status": "confirmed"}},
-                    {"$group": {
-                        "_id": "$donor_address",
-                        "total_donated": {"$sum": "$amount"}
-                    }},
-                    {"$sort": {"total_donated": -1}},
-                    {"$limit": 1}
-                ]
-                
-                top_donor = await self.db.donations.aggregate(top_donor_pipeline).to_list(1)
-                
-                # Get recent donations
-                recent = await self.db.donations.find(
-                    {"status": "confirmed"}
-                ).sort("timestamp", -1).limit(10).to_list(10)
-                
-                return {
-                    "total_donations": stats.get("total_donations", 0),
-                    "donation_count": stats.get("donation_count", 0),
-                    "top_donor": top_donor[0]["_id"] if top_donor else None,
-                    "recent_donations": recent
-                }
-            else:
-                return {
-                    "total_donations": 0,
-                    "donation_count": 0,
-                    "top_donor": None,
-                    "recent_donations": []
-                }
+            batch_filter = {"transaction_hash": {"$in": confirmed_hashes}, "confirmed_batch": batch_id}
+            confirmed = await self.db.donations.find(
+                batch_filter,
+                {"_id": 0, "confirmed_batch": 0}
+            ).to_list(len(confirmed_hashes))
+            await self.db.donations.update_many(batch_filter, {"$unset": {"confirmed_batch": ""}})
+            await self._record_confirmed_donations(confirmed)
+        except Exception as e:
+            logger.error(f"Error updating donation statuses: {e}")
+            raise
+
+    async def get_pending_donation_hashes(self, limit: int = 1000) -> List[str]:
+        """Transaction hashes of submitted donations still awaiting confirmation, least recently checked first"""
+        try:
+            # Never-checked donations (no last_checked_at) sort first, so new ones are
+            # not starved by hashes that keep coming back unresolved
+            pending = await self.db.donations.find(
+                {"status": "pending", "transaction_hash": {"$ne": None}},
+                {"transaction_hash": 1}
+            ).sort([("last_checked_at", 1), ("timestamp", 1)]).limit(limit).to_list(limit)
+            return [donation["transaction_hash"] for donation in pending]
+        except Exception as e:
+            logger.error(f"Error getting pending donations: {e}")
+            raise
+
+    async def mark_donations_checked(self, tx_hashes: List[str]):
+        """Record that the chain was asked about these pending donations"""
+        if not tx_hashes:
+            return
+        try:
+            await self.db.donations.update_many(
+                {"transaction_hash": {"$in": tx_hashes}, "status": "pending"},
+                {"$set": {"last_checked_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.error(f"Error marking donations checked: {e}")
+            raise
+
+    async def fail_unfound_donations(self, tx_hashes: List[str], submitted_before: datetime) -> int:
+        """Fail pending donations the chain has never seen once they are older than the cutoff"""
+        if not tx_hashes:
+            return 0
+        try:
+            result = await self.db.donations.update_many(
+                {
+                    "transaction_hash": {"$in": tx_hashes},
+                    "status": "pending",
+                    "timestamp": {"$lt": submitted_before}
+                },
+                {"$set": {"status": "failed"}}
+            )
+            return result.modified_count
+        except Exception as e:
+            logger.error(f"Error failing unfound donations: {e}")
+            raise
+
+    async def get_donations_by_tx(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get donations for many transaction hashes, keyed by hash"""
+        try:
+            donations = await self.db.donations.find(
+                {"transaction_hash": {"$in": tx_hashes}},
+                {"_id": 0}
+            ).to_list(len(tx_hashes))
+            return {donation["transaction_hash"]: donation for donation in donations}
+        except Exception as e:
+            logger.error(f"Error getting donations by tx: {e}")
+            raise
+
+    async def get_donations_stats(self):
+        """Get donation statistics"""
+        try:
+            return await self.donation_stats_cache.get()
         except Exception as e:
             logger.error(f"Error getting donation stats: {e}")
             return {
@@ -417,4 +1055,78 @@ class Database:
                 "donation_count": 0,
                 "top_donor": None,
                 "recent_donations": []
-            }
\ No newline at end of file
+            }
+
+    async def _load_donation_stats(self) -> Dict[str, Any]:
+        totals = await self.db.donation_totals.find_one({"_id": "global"})
+        if totals is None or not totals.get("seeded"):
+            # Normally seeded by initialize_default_data before the watcher starts;
+            # if another worker is rebuilding, serve what is there until it finishes
+            totals = await self.rebuild_donation_stats() or totals or {}
+        
+        return {
+            "total_donations": totals.get("total_donations", 0),
+            "donation_count": totals.get("donation_count", 0),
+            "top_donor": totals.get("top_donor"),
+            "recent_donations": totals.get("recent_donations", [])
+        }
+
+    async def seed_donation_stats(self):
+        """Build the donation running totals from history once per database"""
+        if await self.db.donation_totals.find_one({"_id": "global", "seeded": True}, {"_id": 1}):
+            return
+        await self.rebuild_donation_stats()
+
+    async def rebuild_donation_stats(self) -> Optional[Dict[str, Any]]:
+        """
+        Recompute donation totals, per-donor sums and recent donations from history.
+        
+        Only one worker rebuilds at a time (None is returned if another holds the
+        lease). Confirmations recorded between the aggregation and the final
+        write are overwritten, so totals can drift by those donations while the
+        watcher runs; rebuild again with the watcher stopped to correct that.
+        """
+        lease = MongoLease(self.db.locks, "donation-stats-rebuild", DONATION_STATS_REBUILD_LEASE_SECONDS)
+        if not await lease.acquire():
+            return None
+        try:
+            # Merge in place (no delete first) so donor_totals is never empty mid-rebuild,
+            # then drop donors from earlier rebuilds that no longer have confirmed donations
+            rebuilt_at = datetime.utcnow()
+            await self.db.donations.aggregate([
+                {"$match": {"status": "confirmed"}},
+                {"$group": {"_id": "$donor_address", "total_donated": {"$sum": "$amount"}}},
+                {"$set": {"rebuilt_at": rebuilt_at}},
+                {"$merge": {"into": "donor_totals", "whenMatched": "replace", "whenNotMatched": "insert"}}
+            ]).to_list(None)
+            await self.db.donor_totals.delete_many({"rebuilt_at": {"$lt": rebuilt_at}})
+            
+            result = await self.db.donations.aggregate([
+                {"$match": {"status": "confirmed"}},
+                {"$group": {
+                    "_id": None,
+                    "total_donations": {"$sum": "$amount"},
+                    "donation_count": {"$sum": 1}
+                }}
+            ]).to_list(1)
+            top_donor = await self.db.donor_totals.find_one({}, sort=[("total_donated", -1)])
+            recent = await self.db.donations.find(
+                {"status": "confirmed"},
+                {"_id": 0}
+            ).sort("timestamp", -1).limit(RECENT_DONATIONS_LIMIT).to_list(RECENT_DONATIONS_LIMIT)
+            
+            totals = {
+                "total_donations": result[0]["total_donations"] if result else 0,
+                "donation_count": result[0]["donation_count"] if result else 0,
+                "recent_donations": recent,
+                "seeded": True
+            }
+            if top_donor:
+                totals["top_donor"] = top_donor["_id"]
+                totals["top_donor_total"] = top_donor["total_donated"]
+            
+            await self.db.donation_totals.replace_one({"_id": "global"}, totals, upsert=True)
+            self.donation_stats_cache.invalidate()
+            return totals
+        finally:
+            await lease.release()
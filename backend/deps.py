@@ -0,0 +1,24 @@
+"""
+Process-wide shared instances.
+
+Routes and auth dependencies both import from here, so there is exactly one
+Database (and one user cache) no matter which module name the app is loaded as.
+"""
+
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+from database import Database, create_client
+from leaderboard import create_leaderboard
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# MongoDB connection
+mongo_url = os.environ['MONGO_URL']
+client = create_client(mongo_url)
+db_instance = Database(client, create_leaderboard())
+
+# Dependency to get database instance
+async def get_database() -> Database:
+    return db_instance
@@ -1,34 +1,116 @@
+import asyncio
 import os
 import logging
-from typing import Optional, Dict, Any
-from web3 import Web3
+import aiohttp
+from urllib.parse import urlsplit
+from typing import Optional, Dict, Any, List, Tuple
+from web3 import AsyncWeb3, Web3
 from eth_account import Account
-from datetime import datetime
+from datetime import datetime, timedelta
 from models import Donation, DonationRequest, DonationResponse
+from cache import AsyncCachedValue
+from scheduler import MongoLease, PeriodicTask
 
 logger = logging.getLogger(__name__)
 
+# Monad RPC configuration
+MONAD_RPC_URL = os.environ.get('MONAD_RPC_URL', 'https://dev0x-rpc.monad.xyz')
+MONAD_RPC_TIMEOUT_SECONDS = float(os.environ.get('MONAD_RPC_TIMEOUT_SECONDS', '10'))
+DONATION_HEALTHCHECK_INTERVAL_SECONDS = float(os.environ.get('DONATION_HEALTHCHECK_INTERVAL_SECONDS', '30'))
+
+# Chain data shared across requests, refreshed at most this often
+GAS_PRICE_TTL_SECONDS = float(os.environ.get('GAS_PRICE_TTL_SECONDS', '5'))
+BLOCK_NUMBER_TTL_SECONDS = float(os.environ.get('BLOCK_NUMBER_TTL_SECONDS', '1'))
+
+# Background confirmation of pending donations
+DONATION_WATCH_INTERVAL_SECONDS = float(os.environ.get('DONATION_WATCH_INTERVAL_SECONDS', '15'))
+DONATION_WATCH_BATCH_SIZE = int(os.environ.get('DONATION_WATCH_BATCH_SIZE', '100'))
+DONATION_WATCH_MAX_PER_RUN = int(os.environ.get('DONATION_WATCH_MAX_PER_RUN', '1000'))
+# Pending donations the chain still does not know after this long are marked failed
+DONATION_NOT_FOUND_EXPIRY_SECONDS = float(os.environ.get('DONATION_NOT_FOUND_EXPIRY_SECONDS', '3600'))
+
 class DonationService:
-    def __init__(self):
+    def __init__(self, rpc_url: Optional[str] = None, timeout: float = MONAD_RPC_TIMEOUT_SECONDS):
         # Monad Testnet configuration
-        self.rpc_url = "https://dev0x-rpc.monad.xyz"
+        self.rpc_url = rpc_url or MONAD_RPC_URL
+        self.timeout = timeout
         self.chain_id = 10143
         self.contract_address = "0xC443647582B1484f9Aba3A6C0B98df59918E17e2"
         
-        # Initialize Web3
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        # Initialize async Web3 so RPC calls never block the event loop
+        self.w3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(
+            self.rpc_url,
+            request_kwargs={"timeout": aiohttp.ClientTimeout(total=self.timeout)}
+        ))
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.health_check = DonationHealthCheck(self)
+        
+        # Single-flight caches: concurrent requests share one RPC call
+        self.gas_price_cache = AsyncCachedValue(self._fetch_gas_price, ttl=GAS_PRICE_TTL_SECONDS)
+        self.block_number_cache = AsyncCachedValue(self._fetch_block_number, ttl=BLOCK_NUMBER_TTL_SECONDS)
         
-        # Validate connection - use mock mode if connection fails (for testing)
+        # Connection is validated on first use and then by the health check -
+        # mock mode while the RPC is unreachable (for testing)
         self.mock_mode = False
+        self.degraded = False
+        self.last_health_check: Optional[datetime] = None
+        self._connection_checked = False
+
+    async def start(self):
+        """Open the persistent HTTP session and start background health checks"""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+            await self.w3.provider.cache_async_session(self.session)
+        self.health_check.start()
+
+    async def close(self):
+        await self.health_check.stop()
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _ensure_connection(self):
+        if not self._connection_checked:
+            await self.check_health()
+
+    async def check_health(self) -> bool:
+        """Probe the RPC and flip mock/degraded mode accordingly"""
+        self._connection_checked = True
+        self.last_health_check = datetime.utcnow()
         try:
-            if not self.w3.is_connected():
-                logger.warning("Failed to connect to Monad Testnet - using mock mode for testing")
-                self.mock_mode = True
-            else:
-                logger.info(f"Connected to Monad Testnet, chain ID: {self.w3.eth.chain_id}")
+            connected = await self.w3.is_connected()
         except Exception as e:
-            logger.warning(f"Web3 connection error: {e} - using mock mode for testing")
-            self.mock_mode = True
+            logger.warning(f"Web3 connection error: {e}")
+            connected = False
+        
+        if connected and self.degraded:
+            logger.info("Monad Testnet reachable again - leaving mock mode")
+        elif not connected and not self.degraded:
+            logger.warning("Failed to connect to Monad Testnet - using mock mode for testing")
+        
+        self.degraded = not connected
+        self.mock_mode = not connected
+        return connected
+
+    async def _fetch_gas_price(self) -> int:
+        return await self.w3.eth.gas_price
+
+    async def _fetch_block_number(self) -> int:
+        return await self.w3.eth.block_number
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            # Scheme and host only: hosted RPC URLs often embed an API key
+            "rpc_host": self._public_rpc_host(),
+            "mock_mode": self.mock_mode,
+            "degraded": self.degraded,
+            "last_health_check": self.last_health_check
+        }
+
+    def _public_rpc_host(self) -> str:
+        parts = urlsplit(self.rpc_url)
+        host = parts.hostname or ""
+        return f"{parts.scheme}://{host}:{parts.port}" if parts.port else f"{parts.scheme}://{host}"
 
     def validate_donation_request(self, request: DonationRequest) -> Dict[str, Any]:
         """Validate donation request parameters"""
@@ -53,6 +135,7 @@ class DonationService:
     async def estimate_gas_and_fees(self, donor_address: str, amount_wei: int) -> Dict[str, Any]:
         """Estimate gas and transaction fees"""
         try:
+            await self._ensure_connection()
             if self.mock_mode:
                 # Return mock gas estimation for testing
                 return {
@@ -65,8 +148,11 @@ class DonationService:
                     "mock_mode": True
                 }
             
-            # Get current gas price
-            gas_price = self.w3.eth.gas_price
+            # Get current gas price and the user's balance concurrently
+            gas_price, balance_wei = await asyncio.gather(
+                self.gas_price_cache.get(),
+                self.w3.eth.get_balance(donor_address)
+            )
             
             # Estimate gas for simple transfer (MON tokens are native, so it's a simple transfer)
             gas_estimate = 21000  # Standard transfer gas limit
@@ -76,7 +162,6 @@ class DonationService:
             total_fee_mon = Web3.from_wei(total_fee_wei, 'ether')
             
             # Check if user has enough balance
-            balance_wei = self.w3.eth.get_balance(donor_address)
             balance_mon = Web3.from_wei(balance_wei, 'ether')
             
             required_total = amount_wei + total_fee_wei
@@ -97,9 +182,10 @@ class DonationService:
                 "sufficient_balance": False
             }
 
-    def build_donation_transaction(self, donor_address: str, amount: float) -> Dict[str, Any]:
+    async def build_donation_transaction(self, donor_address: str, amount: float) -> Dict[str, Any]:
         """Build the donation transaction"""
         try:
+            await self._ensure_connection()
             if self.mock_mode:
                 # Return mock transaction for testing
                 return {
@@ -118,11 +204,11 @@ class DonationService:
             # Convert amount to wei
             amount_wei = Web3.to_wei(amount, 'ether')
             
-            # Get transaction count (nonce)
-            nonce = self.w3.eth.get_transaction_count(donor_address)
-            
-            # Get gas price
-            gas_price = self.w3.eth.gas_price
+            # Get transaction count (nonce) and gas price concurrently
+            nonce, gas_price = await asyncio.gather(
+                self.w3.eth.get_transaction_count(donor_address),
+                self.gas_price_cache.get()
+            )
             
             # Build transaction
             transaction = {
@@ -146,9 +232,10 @@ class DonationService:
                 "success": False
             }
 
-    def get_transaction_status(self, tx_hash: str) -> Dict[str, Any]:
+    async def get_transaction_status(self, tx_hash: str) -> Dict[str, Any]:
         """Get the status of a transaction"""
         try:
+            await self._ensure_connection()
             if self.mock_mode:
                 # Return mock transaction status for testing
                 return {
@@ -158,7 +245,7 @@ class DonationService:
                 }
             
             # Try to get transaction receipt
-            receipt = self.w3.eth.get_transaction_receipt(tx_hash)
+            receipt = await self.w3.eth.get_transaction_receipt(tx_hash)
             
             if receipt:
                 status = "confirmed" if receipt.status == 1 else "failed"
@@ -166,7 +253,7 @@ class DonationService:
                     "status": status,
                     "block_number": receipt.blockNumber,
                     "gas_used": receipt.gasUsed,
-                    "confirmations": self.w3.eth.block_number - receipt.blockNumber + 1
+                    "confirmations": await self.block_number_cache.get() - receipt.blockNumber + 1
                 }
             else:
                 return {"status": "pending"}
@@ -176,11 +263,87 @@ class DonationService:
             try:
                 if not self.mock_mode:
                     # Check if transaction exists (pending)
-                    self.w3.eth.get_transaction(tx_hash)
+                    await self.w3.eth.get_transaction(tx_hash)
                 return {"status": "pending"}
             except Exception:
                 return {"status": "not_found", "error": "Transaction not found"}
 
+    async def get_transaction_statuses(self, tx_hashes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get the status of many transactions with a single JSON-RPC batch round trip"""
+        await self._ensure_connection()
+        if self.mock_mode:
+            return {
+                tx_hash: {
+                    "status": "pending",
+                    "mock_mode": True,
+                    "message": "Mock transaction status - would check blockchain in production"
+                }
+                for tx_hash in tx_hashes
+            }
+        
+        # Receipts and transactions for every hash, plus the chain head
+        calls = [("eth_blockNumber", [])]
+        for tx_hash in tx_hashes:
+            calls.append(("eth_getTransactionReceipt", [tx_hash]))
+            calls.append(("eth_getTransactionByHash", [tx_hash]))
+        
+        try:
+            replies = await self._rpc_batch(calls)
+        except Exception as e:
+            logger.error(f"Batch status check failed: {e}")
+            return {tx_hash: {"status": "unknown", "error": str(e)} for tx_hash in tx_hashes}
+        
+        head = int(replies[0]["result"], 16) if replies[0].get("result") else None
+        statuses = {}
+        for i, tx_hash in enumerate(tx_hashes):
+            receipt_reply, transaction_reply = replies[1 + 2 * i], replies[2 + 2 * i]
+            # A failed lookup (e.g. rate limited) says nothing about the transaction
+            error = receipt_reply.get("error") or transaction_reply.get("error")
+            receipt, transaction = receipt_reply.get("result"), transaction_reply.get("result")
+            if receipt:
+                block_number = int(receipt["blockNumber"], 16)
+                statuses[tx_hash] = {
+                    "status": "confirmed" if int(receipt["status"], 16) == 1 else "failed",
+                    "block_number": block_number,
+                    "gas_used": int(receipt["gasUsed"], 16),
+                    "confirmations": head - block_number + 1 if head is not None else None
+                }
+            elif transaction:
+                statuses[tx_hash] = {"status": "pending"}
+            elif error:
+                statuses[tx_hash] = {"status": "unknown", "error": self._rpc_error_message(error)}
+            else:
+                statuses[tx_hash] = {"status": "not_found", "error": "Transaction not found"}
+        
+        return statuses
+
+    async def _rpc_batch(self, calls: List[Tuple[str, list]]) -> List[Dict[str, Any]]:
+        """Send one JSON-RPC batch and return the replies in call order (missing replies become errors)"""
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+            for i, (method, params) in enumerate(calls)
+        ]
+        
+        session = self.session or aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.timeout))
+        try:
+            async with session.post(self.rpc_url, json=payload) as response:
+                response.raise_for_status()
+                replies = await response.json(content_type=None)
+        finally:
+            if session is not self.session:
+                await session.close()
+        
+        if not isinstance(replies, list):
+            # e.g. a rate limiter answering the whole batch with one error object
+            raise RuntimeError(f"JSON-RPC batch rejected: {replies}")
+        
+        by_id = {reply.get("id"): reply for reply in replies}
+        return [by_id.get(i) or {"error": {"message": "No reply in batch"}} for i in range(len(calls))]
+
+    @staticmethod
+    def _rpc_error_message(error: Any) -> str:
+        return error.get("message", str(error)) if isinstance(error, dict) else str(error)
+
     async def process_donation(self, donation_request: DonationRequest, db) -> DonationResponse:
         """Process a donation request"""
         try:
@@ -214,7 +377,7 @@ class DonationService:
                 )
 
             # Build transaction
-            tx_info = self.build_donation_transaction(
+            tx_info = await self.build_donation_transaction(
                 donation_request.donor_address, 
                 donation_request.amount
             )
@@ -258,7 +421,7 @@ class DonationService:
             await db.update_donation_tx_hash(tx_hash)
             
             # Get transaction status
-            status_info = self.get_transaction_status(tx_hash)
+            status_info = await self.get_transaction_status(tx_hash)
             
             return {
                 "success": True,
@@ -272,4 +435,62 @@ class DonationService:
             return {
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
+
+class DonationHealthCheck(PeriodicTask):
+    """Periodically re-checks RPC connectivity for a long-lived DonationService"""
+
+    name = "donation-health-check"
+
+    def __init__(self, service: DonationService, interval: float = DONATION_HEALTHCHECK_INTERVAL_SECONDS):
+        super().__init__(interval)
+        self.service = service
+
+    async def run_once(self):
+        await self.service.check_health()
+
+
+class DonationConfirmationWatcher(PeriodicTask):
+    """Confirms pending donations in the background using batched receipt checks"""
+
+    name = "donation-confirmation-watcher"
+
+    def __init__(self, service: DonationService, db, interval: float = DONATION_WATCH_INTERVAL_SECONDS):
+        super().__init__(interval)
+        self.service = service
+        self.db = db
+        # Renewed after every batch, so it only has to outlive one batch (one RPC
+        # round trip at worst the RPC timeout, plus the status writes)
+        lease_ttl = max(interval * 2, service.timeout * 3, 30)
+        self.lease = MongoLease(db.db.locks, "donation-confirmation-watcher", lease_ttl)
+
+    async def run_once(self):
+        await self.service._ensure_connection()
+        if self.service.mock_mode:
+            return
+        
+        # One worker polls the chain at a time
+        if not await self.lease.acquire():
+            return
+        try:
+            tx_hashes = await self.db.get_pending_donation_hashes(DONATION_WATCH_MAX_PER_RUN)
+            for start in range(0, len(tx_hashes), DONATION_WATCH_BATCH_SIZE):
+                chunk = tx_hashes[start:start + DONATION_WATCH_BATCH_SIZE]
+                statuses = await self.service.get_transaction_statuses(chunk)
+                await self.db.update_donation_statuses({
+                    tx_hash: status_info["status"]
+                    for tx_hash, status_info in statuses.items()
+                    if status_info.get("status") in ("confirmed", "failed")
+                })
+                await self.db.fail_unfound_donations(
+                    [tx_hash for tx_hash, status_info in statuses.items() if status_info.get("status") == "not_found"],
+                    datetime.utcnow() - timedelta(seconds=DONATION_NOT_FOUND_EXPIRY_SECONDS)
+                )
+                await self.db.mark_donations_checked(chunk)
+                
+                # Stop if another worker took over while this batch ran
+                if not await self.lease.acquire():
+                    logger.warning("Donation watcher lease lost mid-run; stopping early")
+                    return
+        finally:
+            await self.lease.release()
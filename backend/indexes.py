@@ -0,0 +1,108 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from typing import Any, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Indexes backing the query shapes used in database.py, per collection
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+        IndexModel([("wallet_address", ASCENDING)], name="wallet_address_unique", unique=True),
+        IndexModel([("total_score", DESCENDING), ("id", DESCENDING)], name="total_score_id_desc"),
+        IndexModel([("last_active", ASCENDING)], name="last_active"),
+    ],
+    "games": [
+        IndexModel([("id", ASCENDING)], name="id_unique", unique=True),
+    ],
+    "game_sessions": [
+        IndexModel(
+            [("game_id", ASCENDING), ("user_id", ASCENDING), ("score", DESCENDING)],
+            name="game_user_score"
+        ),
+    ],
+    "user_game_bests": [
+        IndexModel(
+            [("user_id", ASCENDING), ("game_id", ASCENDING)],
+            name="user_game_unique",
+            unique=True
+        ),
+        IndexModel(
+            [("game_id", ASCENDING), ("best_score", DESCENDING), ("user_id", DESCENDING)],
+            name="game_best_score_user"
+        ),
+    ],
+    "challenges": [
+        IndexModel(
+            [("is_daily", ASCENDING), ("is_active", ASCENDING), ("expires_at", ASCENDING)],
+            name="daily_active_expires"
+        ),
+    ],
+    "user_challenges": [
+        IndexModel(
+            [("user_id", ASCENDING), ("challenge_id", ASCENDING)],
+            name="user_challenge_unique",
+            unique=True
+        ),
+    ],
+    "platform_counters": [
+        # Drops old daily active-player sketches; the global document has no expires_at
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "login_nonces": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "donations": [
+        IndexModel([("id", ASCENDING)], name="id"),
+        IndexModel([("transaction_hash", ASCENDING)], name="transaction_hash"),
+        IndexModel([("status", ASCENDING), ("timestamp", DESCENDING)], name="status_timestamp"),
+        IndexModel(
+            [("status", ASCENDING), ("last_checked_at", ASCENDING), ("timestamp", ASCENDING)],
+            name="status_last_checked"
+        ),
+    ],
+}
+
+def _key(index: Dict[str, Any]) -> tuple:
+    return tuple((field, int(direction)) for field, direction in index["key"].items())
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """Create every index in INDEX_SPECS; safe to run on every startup"""
+    created = {}
+    for collection, models in INDEX_SPECS.items():
+        try:
+            created[collection] = await db[collection].create_indexes(models)
+        except OperationFailure as e:
+            # e.g. duplicate data blocking a unique index - keep serving, but shout
+            logger.error(f"Failed to create indexes on {collection}: {e}")
+    return created
+
+async def index_report(db) -> Dict[str, Dict[str, Any]]:
+    """Compare existing indexes with INDEX_SPECS and report missing and unused ones"""
+    report = {}
+    for collection, models in INDEX_SPECS.items():
+        existing = {}
+        async for index in db[collection].list_indexes():
+            existing[_key(index)] = index["name"]
+
+        usage = {}
+        try:
+            async for stat in db[collection].aggregate([{"$indexStats": {}}]):
+                usage[stat["name"]] = stat["accesses"]["ops"]
+        except OperationFailure as e:
+            logger.warning(f"$indexStats unavailable for {collection}: {e}")
+
+        expected = {_key(model.document): model.document["name"] for model in models}
+        report[collection] = {
+            "missing": [name for key, name in expected.items() if key not in existing],
+            "unexpected": [
+                name for key, name in existing.items()
+                if key not in expected and name != "_id_"
+            ],
+            "unused": [
+                name for name, ops in usage.items()
+                if ops == 0 and name != "_id_"
+            ],
+        }
+    return report
@@ -0,0 +1,304 @@
+"""
+Sorted-set leaderboard engines with ZADD / ZINCRBY / ZREVRANGE / ZREVRANK semantics.
+
+The engine is opt-in via LEADERBOARD_BACKEND; when unset, leaderboards and ranks
+are read from Mongo. InMemoryLeaderboard keeps each set in an indexable skip list
+(O(log n) updates, rank lookups and top-K reads) and is only correct for a
+single-process deployment, since in-memory sets are per process.
+RedisLeaderboard talks to any Redis-protocol server and should be used when
+several workers serve the API.
+
+Ranks follow the Mongo count rule: a member's rank is one more than the number
+of members scoring strictly higher, so equal scores share a rank. Top-K reads
+order ties by member descending (Redis ZREVRANGE order).
+"""
+
+import os
+import random
+from typing import Dict, List, Optional, Tuple
+
+GLOBAL_KEY = "leaderboard:global"
+
+def game_key(game_id: str) -> str:
+    return f"leaderboard:game:{game_id}"
+
+class LeaderboardBackend:
+    """Interface shared by the leaderboard engines"""
+
+    async def zadd(self, key: str, member: str, score: float, gt: bool = False):
+        raise NotImplementedError
+
+    async def zincrby(self, key: str, member: str, amount: float) -> float:
+        raise NotImplementedError
+
+    async def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        raise NotImplementedError
+
+    async def zrevrank(self, key: str, member: str) -> Optional[int]:
+        raise NotImplementedError
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        raise NotImplementedError
+
+    async def zcount_above(self, key: str, score: float) -> int:
+        """Number of members scoring strictly above score (ZCOUNT key (score +inf)"""
+        raise NotImplementedError
+
+    async def zcard(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+# In-memory engine
+_MAX_LEVEL = 32
+_P = 0.25
+
+class _Node:
+    __slots__ = ("score", "member", "forward", "span", "backward")
+
+    def __init__(self, level: int, score: float, member: Optional[str]):
+        self.score = score
+        self.member = member
+        self.forward: List[Optional["_Node"]] = [None] * level
+        self.span = [0] * level
+        self.backward: Optional["_Node"] = None
+
+class SkipList:
+    """Indexable skip list ordered by (score, member), as used by Redis sorted sets"""
+
+    def __init__(self):
+        self.head = _Node(_MAX_LEVEL, 0, None)
+        self.tail: Optional[_Node] = None
+        self.level = 1
+        self.length = 0
+
+    @staticmethod
+    def _random_level() -> int:
+        level = 1
+        while level < _MAX_LEVEL and random.random() < _P:
+            level += 1
+        return level
+
+    def insert(self, score: float, member: str):
+        update = [self.head] * _MAX_LEVEL
+        rank = [0] * _MAX_LEVEL
+        x = self.head
+        for i in reversed(range(self.level)):
+            rank[i] = 0 if i == self.level - 1 else rank[i + 1]
+            while x.forward[i] and (x.forward[i].score, x.forward[i].member) < (score, member):
+                rank[i] += x.span[i]
+                x = x.forward[i]
+            update[i] = x
+
+        level = self._random_level()
+        if level > self.level:
+            for i in range(self.level, level):
+                rank[i] = 0
+                update[i] = self.head
+                self.head.span[i] = self.length
+            self.level = level
+
+        x = _Node(level, score, member)
+        for i in range(level):
+            x.forward[i] = update[i].forward[i]
+            update[i].forward[i] = x
+            x.span[i] = update[i].span[i] - (rank[0] - rank[i])
+            update[i].span[i] = (rank[0] - rank[i]) + 1
+        for i in range(level, self.level):
+            update[i].span[i] += 1
+
+        x.backward = None if update[0] is self.head else update[0]
+        if x.forward[0]:
+            x.forward[0].backward = x
+        else:
+            self.tail = x
+        self.length += 1
+
+    def delete(self, score: float, member: str) -> bool:
+        update = [self.head] * _MAX_LEVEL
+        x = self.head
+        for i in reversed(range(self.level)):
+            while x.forward[i] and (x.forward[i].score, x.forward[i].member) < (score, member):
+                x = x.forward[i]
+            update[i] = x
+
+        x = x.forward[0]
+        if x is None or x.score != score or x.member != member:
+            return False
+
+        for i in range(self.level):
+            if update[i].forward[i] is x:
+                update[i].span[i] += x.span[i] - 1
+                update[i].forward[i] = x.forward[i]
+            else:
+                update[i].span[i] -= 1
+        if x.forward[0]:
+            x.forward[0].backward = x.backward
+        else:
+            self.tail = x.backward
+        while self.level > 1 and self.head.forward[self.level - 1] is None:
+            self.level -= 1
+        self.length -= 1
+        return True
+
+    def rank(self, score: float, member: str) -> Optional[int]:
+        """0-based ascending rank of an element, or None if absent"""
+        traversed = 0
+        x = self.head
+        for i in reversed(range(self.level)):
+            while x.forward[i] and (x.forward[i].score, x.forward[i].member) <= (score, member):
+                traversed += x.span[i]
+                x = x.forward[i]
+            if x is not self.head and x.member == member:
+                return traversed - 1
+        return None
+
+    def count_above(self, score: float) -> int:
+        """Number of elements with a score strictly greater than score"""
+        traversed = 0
+        x = self.head
+        for i in reversed(range(self.level)):
+            while x.forward[i] and x.forward[i].score <= score:
+                traversed += x.span[i]
+                x = x.forward[i]
+        return self.length - traversed
+
+    def by_rank(self, rank: int) -> Optional[_Node]:
+        """Node at a 0-based ascending rank"""
+        target = rank + 1
+        traversed = 0
+        x = self.head
+        for i in reversed(range(self.level)):
+            while x.forward[i] and traversed + x.span[i] <= target:
+                traversed += x.span[i]
+                x = x.forward[i]
+            if traversed == target:
+                return x
+        return None
+
+class _SortedSet:
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self.skiplist = SkipList()
+
+    def add(self, member: str, score: float, gt: bool = False):
+        current = self.scores.get(member)
+        if current is not None:
+            if current == score or (gt and score <= current):
+                return
+            self.skiplist.delete(current, member)
+        self.scores[member] = score
+        self.skiplist.insert(score, member)
+
+class InMemoryLeaderboard(LeaderboardBackend):
+    def __init__(self):
+        self._sets: Dict[str, _SortedSet] = {}
+
+    def _set(self, key: str) -> _SortedSet:
+        zset = self._sets.get(key)
+        if zset is None:
+            zset = self._sets[key] = _SortedSet()
+        return zset
+
+    async def zadd(self, key: str, member: str, score: float, gt: bool = False):
+        self._set(key).add(member, score, gt=gt)
+
+    async def zincrby(self, key: str, member: str, amount: float) -> float:
+        zset = self._set(key)
+        score = zset.scores.get(member, 0) + amount
+        zset.add(member, score)
+        return score
+
+    async def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        zset = self._sets.get(key)
+        if zset is None:
+            return []
+        length = zset.skiplist.length
+        if start < 0:
+            start = max(length + start, 0)
+        if stop < 0:
+            stop = length + stop
+        stop = min(stop, length - 1)
+        if start > stop:
+            return []
+
+        results = []
+        node = zset.skiplist.by_rank(length - 1 - start)
+        for _ in range(stop - start + 1):
+            results.append((node.member, node.score))
+            node = node.backward
+        return results
+
+    async def zrevrank(self, key: str, member: str) -> Optional[int]:
+        zset = self._sets.get(key)
+        if zset is None or member not in zset.scores:
+            return None
+        rank = zset.skiplist.rank(zset.scores[member], member)
+        return zset.skiplist.length - 1 - rank
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        zset = self._sets.get(key)
+        return zset.scores.get(member) if zset else None
+
+    async def zcount_above(self, key: str, score: float) -> int:
+        zset = self._sets.get(key)
+        return zset.skiplist.count_above(score) if zset else 0
+
+    async def zcard(self, key: str) -> int:
+        zset = self._sets.get(key)
+        return zset.skiplist.length if zset else 0
+
+# Redis engine
+class RedisLeaderboard(LeaderboardBackend):
+    def __init__(self, url: Optional[str] = None, client=None):
+        if client is None:
+            try:
+                import redis.asyncio as aioredis
+            except ImportError:
+                raise RuntimeError("LEADERBOARD_BACKEND=redis requires the 'redis' package")
+            client = aioredis.from_url(url or "redis://localhost:6379/0", decode_responses=True)
+        self.redis = client
+
+    async def zadd(self, key: str, member: str, score: float, gt: bool = False):
+        await self.redis.zadd(key, {member: score}, gt=gt)
+
+    async def zincrby(self, key: str, member: str, amount: float) -> float:
+        return float(await self.redis.zincrby(key, amount, member))
+
+    async def zrevrange(self, key: str, start: int, stop: int) -> List[Tuple[str, float]]:
+        results = await self.redis.zrevrange(key, start, stop, withscores=True)
+        return [(self._decode(member), float(score)) for member, score in results]
+
+    async def zrevrank(self, key: str, member: str) -> Optional[int]:
+        return await self.redis.zrevrank(key, member)
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        score = await self.redis.zscore(key, member)
+        return float(score) if score is not None else None
+
+    async def zcount_above(self, key: str, score: float) -> int:
+        return await self.redis.zcount(key, f"({score}", "+inf")
+
+    async def zcard(self, key: str) -> int:
+        return await self.redis.zcard(key)
+
+    async def close(self):
+        close = getattr(self.redis, "aclose", None) or self.redis.close
+        await close()
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+def create_leaderboard() -> Optional[LeaderboardBackend]:
+    """
+    Build the leaderboard engine selected by LEADERBOARD_BACKEND (redis | memory);
+    None (read leaderboards from Mongo) when unset
+    """
+    backend = os.environ.get('LEADERBOARD_BACKEND', '').lower()
+    if backend == 'redis':
+        return RedisLeaderboard(os.environ.get('REDIS_URL'))
+    if backend == 'memory':
+        return InMemoryLeaderboard()
+    return None
@@ -0,0 +1,31 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+
+class MongoLease:
+    """Cross-worker mutual exclusion backed by a document in the locks collection"""
+
+    def __init__(self, collection, name: str, ttl_seconds: float):
+        self.collection = collection
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            # Matches only a free/expired lease or one we already hold; otherwise the
+            # upsert collides with the holder's _id
+            await self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.ttl_seconds)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def release(self):
+        await self.collection.delete_one({"_id": self.name, "owner": self.owner})
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+MoanGem backend maintenance commands
+
+Usage:
+    python manage.py ensure-indexes
+    python manage.py index-report
+    python manage.py rebuild-game-stats
+    python manage.py rebuild-user-game-bests
+    python manage.py reconcile-counters [--apply]
+    python manage.py rebuild-donation-stats
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from database import Database, create_client
+from indexes import index_report
+
+async def cmd_ensure_indexes(db: Database):
+    await db.ensure_indexes()
+    print("Indexes ensured")
+
+async def cmd_index_report(db: Database):
+    report = await index_report(db.db)
+    print(json.dumps(report, indent=2))
+
+async def cmd_rebuild_game_stats(db: Database):
+    await db.rebuild_game_stats()
+    print("game_stats rebuilt from game_sessions")
+
+async def cmd_rebuild_user_game_bests(db: Database):
+    await db.rebuild_user_game_bests()
+    print("user_game_bests rebuilt from game_sessions")
+
+async def cmd_reconcile_counters(db: Database, apply: bool = False):
+    report = await db.reconcile_platform_counters(apply=apply)
+    print(json.dumps(report, indent=2))
+
+async def cmd_rebuild_donation_stats(db: Database):
+    totals = await db.rebuild_donation_stats()
+    if totals is None:
+        print("Another worker is rebuilding donation stats; try again shortly")
+        return
+    print(f"Donation stats rebuilt: {totals['donation_count']} confirmed donations")
+
+COMMANDS = {
+    "ensure-indexes": cmd_ensure_indexes,
+    "index-report": cmd_index_report,
+    "rebuild-game-stats": cmd_rebuild_game_stats,
+    "rebuild-user-game-bests": cmd_rebuild_user_game_bests,
+    "reconcile-counters": cmd_reconcile_counters,
+    "rebuild-donation-stats": cmd_rebuild_donation_stats,
+}
+
+async def run(command: str, **options):
+    client = create_client(os.environ['MONGO_URL'])
+    try:
+        await COMMANDS[command](Database(client), **options)
+    finally:
+        client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="MoanGem backend maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    parser.add_argument("--apply", action="store_true", help="reconcile-counters: overwrite counters with recomputed values")
+    args = parser.parse_args()
+    options = {"apply": args.apply} if args.command == "reconcile-counters" else {}
+    asyncio.run(run(args.command, **options))
+
+if __name__ == "__main__":
+    main()
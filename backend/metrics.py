@@ -0,0 +1,37 @@
+import time
+from collections import deque
+from typing import Any, Dict
+
+class RateMeter:
+    """Counts events in one-second buckets over a sliding window"""
+
+    def __init__(self, window_seconds: int = 60):
+        self.window_seconds = window_seconds
+        self._buckets: deque = deque()  # [second, count] pairs, oldest first
+        self.total = 0
+
+    def mark(self, count: int = 1):
+        now = int(time.monotonic())
+        self.total += count
+        if self._buckets and self._buckets[-1][0] == now:
+            self._buckets[-1][1] += count
+        else:
+            self._buckets.append([now, count])
+        self._trim(now)
+
+    def _trim(self, now: int):
+        while self._buckets and self._buckets[0][0] <= now - self.window_seconds:
+            self._buckets.popleft()
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = int(time.monotonic())
+        self._trim(now)
+        in_window = sum(count for _, count in self._buckets)
+        last_second = next((count for second, count in self._buckets if second == now - 1), 0)
+        return {
+            "total": self.total,
+            "last_second": last_second,
+            "per_second_avg": round(in_window / self.window_seconds, 3),
+            "peak_per_second": max((count for _, count in self._buckets), default=0),
+            "window_seconds": self.window_seconds
+        }
@@ -83,6 +83,9 @@ class ScoreSubmission(BaseModel):
     tokens_earned: float
     session_data: Dict[str, Any] = {}
 
+class ScoreBatchSubmission(BaseModel):
+    scores: List[ScoreSubmission] = Field(..., min_length=1, max_length=100)
+
 # Leaderboard Models
 class LeaderboardEntry(BaseModel):
     rank: int
@@ -155,6 +158,12 @@ class WalletConnect(BaseModel):
     signature: Optional[str] = None
     message: Optional[str] = None
 
+class LoginChallenge(BaseModel):
+    address: str
+    nonce: str
+    message: str
+    expires_at: datetime
+
 class AuthResponse(BaseModel):
     user: User
     token: str
@@ -196,6 +205,9 @@ class Donation(BaseModel):
     status: str = "pending"  # pending, confirmed, failed
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
+class DonationStatusBatchRequest(BaseModel):
+    tx_hashes: List[str] = Field(..., min_length=1, max_length=100)
+
 class DonationStats(BaseModel):
     total_donations: float
     donation_count: int
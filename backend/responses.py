@@ -0,0 +1,45 @@
+"""
+Fast JSON responses for large read endpoints.
+
+With FAST_JSON_RESPONSES=true, list endpoints return plain dicts built from
+trusted database documents and render them with orjson, skipping pydantic
+validation and FastAPI's jsonable_encoder pass. Without the optional 'orjson'
+package the same responses fall back to the standard encoder.
+"""
+
+import os
+from typing import Any, Dict, Iterable, List, Type
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson when it is installed"""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        return super().render(jsonable_encoder(content))
+
+def trusted_dicts(model: Type[BaseModel], docs: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Shape stored documents like model.dict() without validating them: keep only
+    the model's fields and fill in defaults for missing ones
+    """
+    fields = model.model_fields
+    defaults = {
+        name: field.get_default(call_default_factory=True)
+        for name, field in fields.items() if not field.is_required()
+    }
+    return [
+        {name: doc[name] if name in doc else defaults.get(name) for name in fields}
+        for doc in docs
+    ]
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import os
+from datetime import datetime
+from cache import AsyncCachedValue
+from locks import MongoLease
+from database import Database, PLATFORM_STATS_REFRESH_SECONDS, next_utc_midnight
+
+logger = logging.getLogger(__name__)
+
+# Challenge rotation configuration
+CHALLENGE_CHECK_INTERVAL_SECONDS = float(os.environ.get('CHALLENGE_CHECK_INTERVAL_SECONDS', '300'))
+CHALLENGE_LEASE_SECONDS = float(os.environ.get('CHALLENGE_LEASE_SECONDS', '60'))
+
+class PeriodicTask:
+    """Runs run_once() in a background asyncio task until stopped"""
+
+    name = "periodic-task"
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._task = None
+
+    async def run_once(self):
+        raise NotImplementedError
+
+    def next_delay(self) -> float:
+        return self.interval
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"{self.name} failed: {e}")
+            await asyncio.sleep(self.next_delay())
+
+class ChallengeScheduler(PeriodicTask):
+    """Rotates daily challenges at the UTC day boundary and keeps the challenge cache warm"""
+
+    name = "challenge-scheduler"
+
+    def __init__(self, db: Database, interval: float = CHALLENGE_CHECK_INTERVAL_SECONDS):
+        super().__init__(interval)
+        self.db = db
+        self.lease = MongoLease(db.db.locks, "daily-challenge-rotation", CHALLENGE_LEASE_SECONDS)
+        self._warm = False
+
+    async def run_once(self):
+        # Only one worker rotates; every worker refreshes its own cache
+        if await self.lease.acquire():
+            try:
+                await self.db.rotate_daily_challenges()
+            finally:
+                await self.lease.release()
+
+        self.db.invalidate_challenge_cache()
+        self._warm = bool(await self.db.get_daily_challenges())
+
+    def next_delay(self) -> float:
+        # Retry soon if another worker has not finished rotating yet
+        if not self._warm:
+            return min(self.interval, 5.0)
+        until_rotation = (next_utc_midnight() - datetime.utcnow()).total_seconds() + 1
+        return max(1.0, min(self.interval, until_rotation))
+
+class CacheRefresher(PeriodicTask):
+    """Keeps an AsyncCachedValue fresh so requests rarely wait on its loader"""
+
+    def __init__(self, name: str, cache: AsyncCachedValue, interval: float):
+        super().__init__(interval)
+        self.name = name
+        self.cache = cache
+
+    async def run_once(self):
+        await self.cache.refresh()
+
+def platform_stats_refresher(db: Database) -> CacheRefresher:
+    return CacheRefresher("platform-stats-refresher", db.platform_stats_cache, PLATFORM_STATS_REFRESH_SECONDS)
@@ -1,27 +1,32 @@
 from fastapi import FastAPI, APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 from web3 import Web3
-import os
+from pymongo.errors import DuplicateKeyError
+import re
 import logging
-from pathlib import Path
 from typing import List, Optional
 
 # Import our models and database
 from models import *
-from database import Database
-from auth import get_current_user, authenticate_wallet
-from donations import DonationService
-
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
+from database import Database, calculate_level
+from deps import client, db_instance, get_database
+from scheduler import ChallengeScheduler, platform_stats_refresher
+from auth import (
+    get_current_user, authenticate_wallet, token_cache,
+    signature_cache, signature_recoveries, shutdown_signature_executor,
+    create_nonce_store, build_login_message
+)
+from metrics import RateMeter
+from responses import FAST_JSON_RESPONSES, FastJSONResponse, trusted_dicts
+from donations import DonationConfirmationWatcher, DonationService
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db_instance = Database(client)
+challenge_scheduler = ChallengeScheduler(db_instance)
+stats_refresher = platform_stats_refresher(db_instance)
+donation_service = DonationService()
+donation_watcher = DonationConfirmationWatcher(donation_service, db_instance)
+connect_wallet_meter = RateMeter()
+nonce_store = create_nonce_store(db_instance)
 
 # Create the main app without a prefix
 app = FastAPI(title="MoanGem API", version="1.0.0")
@@ -32,14 +37,20 @@ api_router = APIRouter(prefix="/api")
 # Security
 security = HTTPBearer()
 
-# Dependency to get database instance
-async def get_database() -> Database:
-    return db_instance
+# Dependency to get the shared donation service
+async def get_donation_service() -> DonationService:
+    return donation_service
 
 # Initialize default data on startup
 @app.on_event("startup")
 async def startup_event():
+    await db_instance.ensure_indexes()
     await db_instance.initialize_default_data()
+    await db_instance.warm_leaderboards()
+    challenge_scheduler.start()
+    stats_refresher.start()
+    await donation_service.start()
+    donation_watcher.start()
     logger.info("MoanGem API started successfully")
 
 # Health check
@@ -48,18 +59,38 @@ async def root():
     return {"message": "MoanGem API is running", "version": "1.0.0"}
 
 # Authentication Routes
+@api_router.get("/auth/nonce", response_model=LoginChallenge)
+async def get_login_nonce(address: str):
+    """Issue a single-use nonce for the wallet to sign"""
+    address = address.lower()
+    if not re.match(r'^0x[a-f0-9]{40}$', address):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid wallet address"
+        )
+    
+    nonce, expires_at = await nonce_store.issue(address)
+    return LoginChallenge(
+        address=address,
+        nonce=nonce,
+        message=build_login_message(address, nonce),
+        expires_at=expires_at
+    )
+
 @api_router.post("/auth/connect-wallet", response_model=AuthResponse)
 async def connect_wallet(
     wallet_data: WalletConnect,
     db: Database = Depends(get_database)
 ):
     """Connect wallet and authenticate user"""
+    connect_wallet_meter.mark()
     try:
         user, token = await authenticate_wallet(
             wallet_data.address, 
             wallet_data.signature, 
             db,
-            wallet_data.message
+            wallet_data.message,
+            nonce_store=nonce_store
         )
         
         return AuthResponse(
@@ -67,6 +98,9 @@ async def connect_wallet(
             token=token,
             message="Wallet connected successfully"
         )
+    except HTTPException:
+        # Keep 401s for bad signatures and invalid nonces
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -92,7 +126,14 @@ async def create_user(
             detail="User with this wallet address already exists"
         )
     
-    return await db.create_user(user_data)
+    try:
+        return await db.create_user(user_data)
+    except DuplicateKeyError:
+        # Lost a race with a concurrent create for the same wallet
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this wallet address already exists"
+        )
 
 @api_router.get("/users/stats/{user_id}", response_model=UserStats)
 async def get_user_stats(
@@ -107,10 +148,8 @@ async def get_user_stats(
             detail="User not found"
         )
     
-    # Calculate rank (simplified)
-    all_users = await db.db.users.find({}, {"total_score": 1}).to_list(1000)
-    sorted_users = sorted(all_users, key=lambda x: x.get("total_score", 0), reverse=True)
-    rank = next((i + 1 for i, u in enumerate(sorted_users) if u["_id"] == user_id), 999)
+    # O(log n) rank from the leaderboard engine when enabled, else an indexed count
+    rank = await db.get_user_rank(user)
     
     return UserStats(
         total_score=user.total_score,
@@ -125,22 +164,9 @@ async def get_user_stats(
 @api_router.get("/games/list", response_model=List[Game])
 async def get_games(db: Database = Depends(get_database)):
     """Get list of all games"""
-    games = await db.db.games.find({}).to_list(100)
-    
-    # Update play counts from game sessions
-    for game in games:
-        play_count = await db.db.game_sessions.count_documents({"game_id": game["id"]})
-        game["play_count"] = play_count
-        
-        # Calculate average score
-        pipeline = [
-            {"$match": {"game_id": game["id"]}},
-            {"$group": {"_id": None, "avg_score": {"$avg": "$score"}}}
-        ]
-        avg_result = await db.db.game_sessions.aggregate(pipeline).to_list(1)
-        game["avg_score"] = int(avg_result[0]["avg_score"]) if avg_result else 0
-    
-    return [Game(**game) for game in games]
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse(await db.get_games_with_stats(as_dicts=True))
+    return await db.get_games_with_stats()
 
 @api_router.post("/games/score", response_model=ScoreResponse)
 async def submit_score(
@@ -150,10 +176,6 @@ async def submit_score(
 ):
     """Submit game score"""
     try:
-        # Get user's previous high score
-        prev_high_score = await db.get_user_high_score(current_user.id, score_data.game_id)
-        is_new_high_score = score_data.score > prev_high_score
-        
         # Create game session
         session_data = GameSessionCreate(
             game_id=score_data.game_id,
@@ -162,11 +184,15 @@ async def submit_score(
             session_data=score_data.session_data
         )
         
-        session = await db.create_game_session(current_user.id, session_data)
+        session, updated_user, is_new_high_score = await db.create_game_session(
+            current_user.id,
+            session_data,
+            player=current_user.username or current_user.wallet_address
+        )
         
-        # Get updated user data
-        updated_user = await db.get_user_by_id(current_user.id)
-        level_up = updated_user.level > current_user.level if updated_user else False
+        # Compare against the level implied by the pre-update total, not the cached user
+        previous_level = calculate_level(updated_user.total_score - session.score) if updated_user else 1
+        level_up = updated_user.level > previous_level if updated_user else False
         
         return ScoreResponse(
             success=True,
@@ -183,6 +209,57 @@ async def submit_score(
             detail=f"Failed to submit score: {str(e)}"
         )
 
+@api_router.post("/games/scores/batch", response_model=List[ScoreResponse])
+async def submit_scores_batch(
+    batch: ScoreBatchSubmission,
+    current_user: User = Depends(get_current_user),
+    db: Database = Depends(get_database)
+):
+    """Submit many game scores in one request"""
+    try:
+        sessions_data = [
+            GameSessionCreate(
+                game_id=score_data.game_id,
+                score=score_data.score,
+                duration=score_data.session_data.get("duration", 0),
+                session_data=score_data.session_data
+            )
+            for score_data in batch.scores
+        ]
+        
+        sessions, updated_user, new_high_scores = await db.create_game_sessions_batch(
+            current_user.id,
+            sessions_data,
+            player=current_user.username or current_user.wallet_address
+        )
+        
+        # Replay the batch from the pre-update totals to attribute level ups and balances per item
+        running_score = updated_user.total_score - sum(s.score for s in sessions) if updated_user else 0
+        running_tokens = updated_user.tokens_earned - sum(s.tokens_earned for s in sessions) if updated_user else 0
+        
+        responses = []
+        for session, is_new_high_score in zip(sessions, new_high_scores):
+            previous_level = calculate_level(running_score)
+            running_score += session.score
+            running_tokens += session.tokens_earned
+            
+            responses.append(ScoreResponse(
+                success=True,
+                new_high_score=is_new_high_score,
+                tokens_awarded=session.tokens_earned,
+                total_tokens=running_tokens if updated_user else 0,
+                level_up=calculate_level(running_score) > previous_level if updated_user else False,
+                message=f"Score submitted successfully! {'New high score!' if is_new_high_score else ''}"
+            ))
+        
+        return responses
+        
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to submit scores: {str(e)}"
+        )
+
 @api_router.get("/games/{game_id}/leaderboard", response_model=List[LeaderboardEntry])
 async def get_game_leaderboard(
     game_id: str,
@@ -199,6 +276,8 @@ async def get_global_leaderboard(
     db: Database = Depends(get_database)
 ):
     """Get global leaderboard"""
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse(await db.get_global_leaderboard(limit, as_dicts=True))
     return await db.get_global_leaderboard(limit)
 
 # Challenge Routes
@@ -225,8 +304,9 @@ async def get_my_challenge_progress(
     challenges = await db.get_daily_challenges()
     
     # Add user progress to each challenge
+    progress = await db.get_user_challenges_progress(current_user.id, [c.id for c in challenges])
     for challenge in challenges:
-        user_challenge = await db.get_user_challenge_progress(current_user.id, challenge.id)
+        user_challenge = progress.get(challenge.id)
         if user_challenge:
             challenge.progress = user_challenge.progress
             challenge.completed = user_challenge.completed
@@ -273,6 +353,24 @@ async def get_platform_stats(db: Database = Depends(get_database)):
     """Get platform statistics"""
     return await db.get_platform_stats()
 
+@api_router.get("/platform/metrics")
+async def get_platform_metrics(db: Database = Depends(get_database)):
+    """Get internal performance metrics"""
+    return {
+        "mongo_pool": db.get_pool_stats(),
+        "donation_rpc": donation_service.health(),
+        "gas_price_cache": donation_service.gas_price_cache.stats(),
+        "block_number_cache": donation_service.block_number_cache.stats(),
+        "user_cache": db.user_cache.stats(),
+        "challenge_cache": db.challenge_cache.stats(),
+        "platform_stats_cache": db.platform_stats_cache.stats(),
+        "donation_stats_cache": db.donation_stats_cache.stats(),
+        "token_cache": token_cache.stats(),
+        "signature_cache": signature_cache.stats(),
+        "signature_recoveries": signature_recoveries.snapshot(),
+        "connect_wallet_requests": connect_wallet_meter.snapshot()
+    }
+
 @api_router.post("/admin/activate-game/{game_id}")
 async def activate_game(game_id: str, db: Database = Depends(get_database)):
     """Activate a game (admin endpoint)"""
@@ -290,11 +388,10 @@ async def activate_game(game_id: str, db: Database = Depends(get_database)):
 async def create_donation(
     donation_request: DonationRequest,
     current_user: User = Depends(get_current_user),
-    db: Database = Depends(get_database)
+    db: Database = Depends(get_database),
+    donation_service: DonationService = Depends(get_donation_service)
 ):
     """Create a new donation"""
-    donation_service = DonationService()
-    
     # Verify the donor address matches the authenticated user
     if donation_request.donor_address.lower() != current_user.wallet_address.lower():
         raise HTTPException(
@@ -308,32 +405,61 @@ async def create_donation(
 async def confirm_donation(
     tx_hash: str,
     current_user: User = Depends(get_current_user),
-    db: Database = Depends(get_database)
+    db: Database = Depends(get_database),
+    donation_service: DonationService = Depends(get_donation_service)
 ):
     """Confirm a donation transaction"""
-    donation_service = DonationService()
     return await donation_service.confirm_donation(tx_hash, db)
 
+@api_router.post("/donations/status/batch")
+async def get_donation_statuses(
+    batch: DonationStatusBatchRequest,
+    db: Database = Depends(get_database),
+    donation_service: DonationService = Depends(get_donation_service)
+):
+    """Get the status of many donation transactions with one RPC round trip"""
+    tx_hashes = list(dict.fromkeys(batch.tx_hashes))
+    statuses = await donation_service.get_transaction_statuses(tx_hashes)
+    
+    # Persist final states: one bulk write for the transitions, then the running totals
+    await db.update_donation_statuses({
+        tx_hash: status_info["status"]
+        for tx_hash, status_info in statuses.items()
+        if status_info.get("status") in ("confirmed", "failed")
+    })
+    
+    donations = await db.get_donations_by_tx(tx_hashes)
+    
+    return [
+        {
+            "transaction_hash": tx_hash,
+            "blockchain_status": statuses[tx_hash],
+            "donation": donations.get(tx_hash)
+        }
+        for tx_hash in tx_hashes
+    ]
+
 @api_router.get("/donations/status/{tx_hash}")
 async def get_donation_status(
     tx_hash: str,
-    db: Database = Depends(get_database)
+    db: Database = Depends(get_database),
+    donation_service: DonationService = Depends(get_donation_service)
 ):
     """Get donation transaction status"""
-    donation_service = DonationService()
-    
-    # Get transaction status from blockchain
-    status_info = donation_service.get_transaction_status(tx_hash)
-    
-    # Update database if confirmed
-    if status_info.get("status") == "confirmed":
-        await db.update_donation_status(tx_hash, "confirmed")
-    elif status_info.get("status") == "failed":
-        await db.update_donation_status(tx_hash, "failed")
-    
-    # Get donation details
     donation = await db.get_donation_by_tx(tx_hash)
     
+    # Final states are recorded by the confirmation watcher - no need to ask the chain
+    if donation and donation.get("status") in ("confirmed", "failed"):
+        status_info = {"status": donation["status"]}
+    else:
+        # Get transaction status from blockchain
+        status_info = await donation_service.get_transaction_status(tx_hash)
+        
+        # Update database only when the status actually changed
+        if donation and status_info.get("status") in ("confirmed", "failed"):
+            await db.update_donation_status(tx_hash, status_info["status"])
+            donation["status"] = status_info["status"]
+    
     return {
         "transaction_hash": tx_hash,
         "blockchain_status": status_info,
@@ -344,15 +470,21 @@ async def get_donation_status(
 async def get_donation_stats(db: Database = Depends(get_database)):
     """Get donation statistics"""
     stats = await db.get_donations_stats()
+    if FAST_JSON_RESPONSES:
+        # Totals and the recent ring are written by this service, so skip re-validation
+        return FastJSONResponse({
+            **stats,
+            "recent_donations": trusted_dicts(Donation, stats["recent_donations"])
+        })
     return DonationStats(**stats)
 
 @api_router.get("/donations/estimate-gas")
 async def estimate_donation_gas(
     amount: float,
-    donor_address: str
+    donor_address: str,
+    donation_service: DonationService = Depends(get_donation_service)
 ):
     """Estimate gas fees for a donation"""
-    donation_service = DonationService()
     amount_wei = Web3.to_wei(amount, 'ether')
     return await donation_service.estimate_gas_and_fees(donor_address, amount_wei)
 
@@ -376,4 +508,11 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await challenge_scheduler.stop()
+    await stats_refresher.stop()
+    await donation_watcher.stop()
+    await donation_service.close()
+    shutdown_signature_executor()
+    if db_instance.leaderboard is not None:
+        await db_instance.leaderboard.close()
     client.close()
\ No newline at end of file
@@ -69,8 +69,8 @@ export const AuthProvider = ({ children }) => {
       const walletData = await wallet.connect();
       if (!walletData) return;
 
-      // Generate authentication message
-      const message = `Sign this message to authenticate with MoanGem:\n\nAddress: ${walletData.address}\nTimestamp: ${Date.now()}`;
+      // Get a single-use authentication message from the backend
+      const message = await authService.getLoginMessage(walletData.address);
       
       // Sign the message
       const signature = await wallet.signMessage(message);
@@ -1,6 +1,18 @@
 import api from './api';
 
 class AuthService {
+  // Get a server-issued login message (single-use nonce) to sign
+  async getLoginMessage(walletAddress) {
+    try {
+      const response = await api.get('/auth/nonce', {
+        params: { address: walletAddress }
+      });
+      return response.data.message;
+    } catch (error) {
+      throw new Error(error.response?.data?.detail || 'Failed to get login nonce');
+    }
+  }
+
   // Connect wallet and authenticate
   async connectWallet(walletAddress, signature = null, message = null) {
     try {
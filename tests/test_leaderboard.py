@@ -0,0 +1,76 @@
+import asyncio
+import random
+
+import pytest
+
+from leaderboard import GLOBAL_KEY, InMemoryLeaderboard, RedisLeaderboard, SkipList
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_skiplist_matches_sorted_reference():
+    random.seed(7)
+    skiplist = SkipList()
+    reference = {}
+    for _ in range(5000):
+        member = f"user-{random.randrange(300)}"
+        if member in reference and random.random() < 0.4:
+            assert skiplist.delete(reference.pop(member), member)
+        elif member not in reference:
+            reference[member] = float(random.randrange(50))
+            skiplist.insert(reference[member], member)
+
+    ordered = sorted((score, member) for member, score in reference.items())
+    assert skiplist.length == len(ordered)
+    for rank, (score, member) in enumerate(ordered):
+        assert skiplist.rank(score, member) == rank
+        node = skiplist.by_rank(rank)
+        assert (node.score, node.member) == (score, member)
+    for score in range(-1, 51):
+        assert skiplist.count_above(score) == sum(1 for s, _ in ordered if s > score)
+
+def test_skiplist_delete_missing_returns_false():
+    skiplist = SkipList()
+    skiplist.insert(1.0, "a")
+    assert not skiplist.delete(2.0, "a")
+    assert not skiplist.delete(1.0, "b")
+    assert skiplist.length == 1
+
+def exercise_backend(board):
+    async def scenario():
+        await board.zadd(GLOBAL_KEY, "alice", 10)
+        await board.zadd(GLOBAL_KEY, "bob", 30)
+        await board.zadd(GLOBAL_KEY, "carol", 30)
+        assert await board.zincrby(GLOBAL_KEY, "alice", 5) == 15
+
+        # gt only ever raises a score
+        await board.zadd(GLOBAL_KEY, "alice", 12, gt=True)
+        assert await board.zscore(GLOBAL_KEY, "alice") == 15
+        await board.zadd(GLOBAL_KEY, "alice", 20, gt=True)
+        assert await board.zscore(GLOBAL_KEY, "alice") == 20
+
+        # Ties are listed by member descending
+        assert await board.zrevrange(GLOBAL_KEY, 0, -1) == [("carol", 30), ("bob", 30), ("alice", 20)]
+        assert await board.zrevrange(GLOBAL_KEY, 1, 1) == [("bob", 30)]
+        assert await board.zrevrange(GLOBAL_KEY, 5, 10) == []
+        assert await board.zrevrank(GLOBAL_KEY, "alice") == 2
+        assert await board.zrevrank(GLOBAL_KEY, "dave") is None
+
+        # Equal scores share a rank, as with the Mongo count fallback
+        assert await board.zcount_above(GLOBAL_KEY, 30) == 0
+        assert await board.zcount_above(GLOBAL_KEY, 20) == 2
+        assert await board.zcard(GLOBAL_KEY) == 3
+        assert await board.zcard("missing") == 0
+        assert await board.zrevrange("missing", 0, 9) == []
+        assert await board.zscore("missing", "alice") is None
+        assert await board.zcount_above("missing", 0) == 0
+        await board.close()
+
+    run(scenario())
+
+def test_in_memory_leaderboard():
+    exercise_backend(InMemoryLeaderboard())
+
+def test_redis_leaderboard_with_fake_client():
+    fakeredis = pytest.importorskip("fakeredis")
+    exercise_backend(RedisLeaderboard(client=fakeredis.FakeAsyncRedis(decode_responses=True)))